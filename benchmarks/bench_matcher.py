@@ -0,0 +1,97 @@
+"""
+Benchmark: trie matcher vs. per-length set probing in detect_word_levels.
+
+Builds synthetic texts from the bundled vocabulary, lemmatizes them once,
+and times only the matching step of both strategies on the same lemma
+sequence. Both strategies must produce identical output.
+
+Usage:
+    python benchmarks/bench_matcher.py [--sizes 1000 10000 100000] [--repeat 3]
+"""
+
+import argparse
+import csv
+import random
+import time
+
+from salsa_spa import word_level
+from salsa_spa.text_cleaning import extract_words, lemmatize_tokens
+from salsa_spa.vocab_lists import VOCAB_CSV_PATH, level_dict_by_length
+
+FILLER_WORDS = "el la de que y en un los se no con por para su lo como más pero".split()
+
+
+def match_by_set_probing(words: list[str], lemmas: list[str]) -> list[tuple[str, str]]:
+    # Previous strategy: probe every level's set for every n-gram length
+    max_length = 1
+    for level, length_dict in level_dict_by_length.items():
+        if length_dict:
+            max_length = max(max_length, max(length_dict.keys()))
+
+    result = []
+    i = 0
+    while i < len(words):
+        matched = False
+        for n in range(min(max_length, len(words) - i), 0, -1):
+            lemmatized_ngram = " ".join(lemmas[i:i + n])
+            for level in word_level.LEVEL_ORDER:
+                if level in level_dict_by_length:
+                    length_dict = level_dict_by_length[level]
+                    if n in length_dict and lemmatized_ngram in length_dict[n]:
+                        result.append((" ".join(words[i:i + n]), level))
+                        i += n
+                        matched = True
+                        break
+            if matched:
+                break
+        if not matched:
+            result.append((words[i], "No results"))
+            i += 1
+    return result
+
+
+def make_text(n_words: int, seed: int = 0) -> str:
+    # Mix vocabulary entries (including multi-word ones) with filler words
+    rng = random.Random(seed)
+    with open(VOCAB_CSV_PATH, "r", encoding="utf-8") as f:
+        entries = [row["word"] for row in csv.DictReader(f)]
+    tokens: list[str] = []
+    while len(tokens) < n_words:
+        source = entries if rng.random() < 0.4 else FILLER_WORDS
+        tokens.extend(rng.choice(source).split())
+    return " ".join(tokens[:n_words])
+
+
+def best_time(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    word_level.get_expression_trie()
+    print(f"trie build: {time.perf_counter() - start:.3f}s")
+
+    print(f"{'words':>8} {'set probing':>12} {'trie':>10} {'speedup':>8}")
+    for size in args.sizes:
+        words = extract_words(text=make_text(size))
+        lemmas = lemmatize_tokens(words)
+        expected = match_by_set_probing(words, lemmas)
+        assert word_level.match_word_levels(words, lemmas) == expected
+
+        probing = best_time(lambda: match_by_set_probing(words, lemmas), args.repeat)
+        trie = best_time(lambda: word_level.match_word_levels(words, lemmas), args.repeat)
+        print(f"{size:>8} {probing:>11.4f}s {trie:>9.4f}s {probing / trie:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
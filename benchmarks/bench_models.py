@@ -0,0 +1,157 @@
+"""
+Benchmark: spaCy model and excluded components.
+
+Runs each pipeline configuration in a fresh interpreter process (with
+SALSA_SPACY_MODEL and SALSA_SPACY_EXCLUDE set) and reports model load time,
+RSS after loading and how much loading added, the vocabulary load or build time, spaCy lemmatization
+throughput on distinct words (lemma cache and table bypassed) and
+grade_many throughput. Every configuration grades the same generated texts,
+and the report lists how many predicted levels and grades differ from the
+first configuration.
+
+A configuration is MODEL or MODEL:COMPONENT,COMPONENT,...; an empty
+component list loads the whole pipeline. "vectors" as a component skips
+the static word vectors.
+
+Usage:
+    python benchmarks/bench_models.py [--config es_core_news_md es_core_news_sm
+        es_core_news_sm:parser,ner,attribute_ruler,senter,vectors] [--texts 200]
+        [--words 200] [--output report.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+DEFAULT_CONFIGS = [
+    "es_core_news_md",
+    "es_core_news_sm",
+    "es_core_news_sm:parser,ner,attribute_ruler,senter,vectors",
+]
+
+# Timed in a child process so the model and vocabulary loads are cold.
+# Memory is the current RSS (Linux): ru_maxrss of an exec'd child can
+# include the parent's peak.
+CONFIG_SCRIPT = """
+import json, sys, time
+n_texts, n_words, n_lemmatize, seed = map(int, sys.argv[1:5])
+
+def rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+
+rss_before = rss()
+start = time.perf_counter()
+from salsa_spa.text_cleaning import get_nlp, get_pipeline
+nlp = get_nlp()
+model_seconds = time.perf_counter() - start
+model_rss = rss()
+start = time.perf_counter()
+from salsa_spa.word_level import get_expression_trie
+get_expression_trie()
+vocabulary_seconds = time.perf_counter() - start
+
+from bench_matcher import make_text
+from salsa_spa.grader_prob import grade_many
+from salsa_spa.text_cleaning import extract_words, lemma_cache, lemmatize_tokens
+tokens = make_text(n_texts * n_words, seed=seed).split()
+texts = [" ".join(tokens[i::n_texts]) for i in range(n_texts)]
+words = list(dict.fromkeys(w for text in texts for w in extract_words(text=text)))[:n_lemmatize]
+lemma_cache.clear()
+start = time.perf_counter()
+lemmatize_tokens(words)
+lemmatize_seconds = time.perf_counter() - start
+start = time.perf_counter()
+results = [result for result, _ in grade_many(texts)]
+grade_seconds = time.perf_counter() - start
+
+model_name, exclude = get_pipeline()
+print(json.dumps({
+    "model": model_name,
+    "exclude": list(exclude),
+    "pipe_names": nlp.pipe_names,
+    "vectors": nlp.vocab.vectors.shape[0],
+    "model_load_s": model_seconds,
+    "model_rss_bytes": model_rss,
+    "model_rss_growth_bytes": model_rss - rss_before if rss_before is not None else None,
+    "vocabulary_load_s": vocabulary_seconds,
+    "lemmatize_words_per_s": len(words) / lemmatize_seconds if lemmatize_seconds else None,
+    "grade_texts_per_s": len(texts) / grade_seconds if grade_seconds else None,
+    "rss_bytes": rss(),
+    "grades": [[r["predicted_level"], r["grade"]] for r in results],
+}))
+"""
+
+
+def run_config(config: str, args: argparse.Namespace) -> dict:
+    model_name, _, exclude = config.partition(":")
+    env = os.environ.copy()
+    env["SALSA_SPACY_MODEL"] = model_name
+    if ":" in config:
+        env["SALSA_SPACY_EXCLUDE"] = exclude
+    else:
+        env.pop("SALSA_SPACY_EXCLUDE", None)
+    output = subprocess.run(
+        [
+            sys.executable, "-c", CONFIG_SCRIPT,
+            str(args.texts), str(args.words), str(args.lemmatize_words), str(args.seed),
+        ],
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare_grades(reference: list, grades: list) -> dict:
+    level_changes = sum(a[0] != b[0] for a, b in zip(reference, grades))
+    differences = [abs(a[1] - b[1]) for a, b in zip(reference, grades)]
+    return {
+        "texts": len(grades),
+        "predicted_level_changes": level_changes,
+        "grade_changes": sum(d > 1e-12 for d in differences),
+        "max_grade_difference": max(differences, default=0.0),
+        "mean_grade_difference": sum(differences) / len(differences) if differences else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--config", nargs="+", default=DEFAULT_CONFIGS)
+    parser.add_argument("--texts", type=int, default=200, help="Texts graded per configuration")
+    parser.add_argument("--words", type=int, default=200, help="Words per text")
+    parser.add_argument("--lemmatize-words", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {}
+    reference = None
+    for config in args.config:
+        result = run_config(config, args)
+        grades = result.pop("grades")
+        if reference is None:
+            reference = grades
+        result["vs_" + args.config[0]] = compare_grades(reference, grades)
+        report[config] = result
+        print(f"{config} done", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Benchmark suite for the grading pipeline, offline and reproducible.
+
+Generates Spanish texts of several sizes from the bundled vocabulary (see
+bench_matcher.make_text) with a fixed seed, and times each stage on its own:
+vocabulary load, lemmatize_word, detect_word_levels and
+grade_with_probabilities. For every stage and size it reports throughput
+(words/s), latency percentiles and peak traced memory, for warm runs and
+separately for cold runs that start from an empty lemma cache. The report
+is JSON, so runs on different commits or machines can be compared.
+
+Vocabulary load is timed in fresh interpreter processes, which also report
+how much their RSS grew: once from the index in the cache directory and,
+with --vocab-build, once from the CSV in an empty cache directory.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 10 100 1000 10000 100000]
+        [--repeat 20] [--seed 0] [--vocab-build] [--output report.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+from bench_matcher import make_text
+from salsa_spa.grader_prob import grade_with_probabilities
+from salsa_spa.lemma_table import clear_lemma_table, get_lemma_table
+from salsa_spa.text_cleaning import (
+    extract_words,
+    get_nlp,
+    get_pipeline,
+    lemma_cache,
+    lemmatize_word,
+)
+from salsa_spa.vocab_index import package_version
+from salsa_spa.vocab_lists import get_vocabulary_trie
+from salsa_spa.word_level import detect_word_levels
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+# Timed in a child process so the import and load are cold. Memory is the
+# growth of the current RSS (Linux): ru_maxrss of an exec'd child can
+# include the parent's peak, which inflates it.
+VOCAB_LOAD_SCRIPT = """
+import json, time
+
+def rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+
+rss_before = rss()
+start = time.perf_counter()
+from salsa_spa.vocab_lists import get_vocabulary_trie
+get_vocabulary_trie()
+seconds = time.perf_counter() - start
+rss_after = rss()
+print(json.dumps({
+    "seconds": seconds,
+    "rss_before_bytes": rss_before,
+    "rss_after_bytes": rss_after,
+    "rss_growth_bytes": rss_after - rss_before if rss_before is not None else None,
+}))
+"""
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    # Nearest-rank percentile of an already sorted list
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], n_words: int) -> dict:
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        "runs": len(ordered),
+        "words": n_words,
+        "mean_s": total / len(ordered),
+        "p50_s": percentile(ordered, 50),
+        "p90_s": percentile(ordered, 90),
+        "p99_s": percentile(ordered, 99),
+        "max_s": ordered[-1],
+        "words_per_s": n_words * len(ordered) / total if total else None,
+    }
+
+
+def peak_memory(func: Callable[[], object]) -> int:
+    # Peak Python allocations of one call, measured separately from the
+    # timed runs because tracing slows them down
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def clear_lemma_caches() -> None:
+    # Back to the state of a fresh process: an empty lemma cache and a lemma
+    # table holding only the vocabulary forms. Loading the table is not timed.
+    lemma_cache.clear()
+    clear_lemma_table()
+    get_lemma_table()
+
+
+def bench(func: Callable[[], object], n_words: int, repeat: int, cold_repeat: int = 3) -> dict:
+    # Cold runs start from empty lemma caches, so words not in the lemma
+    # table go through spaCy; the warm runs after them hit the caches
+    cold = []
+    for _ in range(cold_repeat):
+        clear_lemma_caches()
+        start = time.perf_counter()
+        func()
+        cold.append(time.perf_counter() - start)
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    report = summarize(latencies, n_words)
+    report["cold"] = summarize(cold, n_words)
+    report["peak_memory_bytes"] = peak_memory(func)
+    return report
+
+
+def bench_vocabulary_load(build: bool) -> dict:
+    results = {}
+    runs = [("index", os.environ.copy())]
+    if build:
+        env = os.environ.copy()
+        env["SALSA_CACHE_DIR"] = tempfile.mkdtemp(prefix="salsa-bench-")
+        runs.insert(0, ("csv", env))
+    for name, env in runs:
+        output = subprocess.run(
+            [sys.executable, "-c", VOCAB_LOAD_SCRIPT],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results[name] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def bench_lemmatize_word(words: list[str]) -> dict:
+    # Cold: every word goes through spaCy; warm: every word is a cache hit.
+    # The model is loaded first so the first cold run does not include it.
+    get_nlp()
+    lemma_cache.clear()
+    cold = []
+    for word in words:
+        start = time.perf_counter()
+        lemmatize_word(word)
+        cold.append(time.perf_counter() - start)
+    warm = []
+    for word in words:
+        start = time.perf_counter()
+        lemmatize_word(word)
+        warm.append(time.perf_counter() - start)
+    # Each run lemmatizes one word
+    return {"cold": summarize(cold, 1), "warm": summarize(warm, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per size")
+    parser.add_argument(
+        "--max-words", type=int, default=500000,
+        help="Cap on words processed per stage and size; large sizes get fewer runs",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lemmatize-words", type=int, default=500)
+    parser.add_argument("--vocab-build", action="store_true", help="Also time building the vocabulary from the CSV")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    model_name, exclude = get_pipeline()
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "spacy": package_version("spacy"),
+            "model": model_name,
+            "model_version": package_version(model_name),
+            "exclude": list(exclude),
+            "salsa_spa": package_version("salsa-spa"),
+            "seed": args.seed,
+        },
+        "vocabulary_load": bench_vocabulary_load(build=args.vocab_build),
+    }
+
+    get_vocabulary_trie()
+    words = list(dict.fromkeys(extract_words(text=make_text(args.lemmatize_words * 4, args.seed))))
+    report["lemmatize_word"] = bench_lemmatize_word(words[:args.lemmatize_words])
+
+    detect = {}
+    grade = {}
+    for size in args.sizes:
+        text = make_text(size, seed=args.seed)
+        n_words = len(extract_words(text=text))
+        repeat = max(3, min(args.repeat, args.max_words // max(size, 1)))
+        detect[str(size)] = bench(lambda: detect_word_levels(text=text), n_words, repeat)
+        grade[str(size)] = bench(lambda: grade_with_probabilities(text=text), n_words, repeat)
+        print(f"{size} words done", file=sys.stderr)
+    report["detect_word_levels"] = detect
+    report["grade_with_probabilities"] = grade
+    report["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
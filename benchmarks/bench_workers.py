@@ -0,0 +1,166 @@
+"""
+Benchmark: memory of N grading worker processes.
+
+Starts N workers that load the vocabulary and lemma table (and, with
+--model, the spaCy model), grade a few generated texts, run a full garbage
+collection and then, while all of them are alive, read their memory from
+/proc/self/smaps_rollup:
+RSS, PSS (resident memory with shared pages split between the processes
+sharing them) and private memory. Summed PSS is what the workers cost in
+total.
+
+--start spawn starts fresh interpreters that each load everything
+themselves; --start fork warms up the parent first (optionally calling
+gc.freeze(), see salsa_spa.warmup) and forks the workers from it. Linux only.
+
+Usage:
+    python benchmarks/bench_workers.py [--workers 1 2 4 8] [--start spawn fork]
+        [--model] [--freeze] [--output report.json]
+"""
+
+import argparse
+import csv
+import gc
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+
+from salsa_spa.vocab_lists import VOCAB_CSV_PATH
+
+FILLER_WORDS = "el la de que y en un los se no con por para su lo como más pero".split()
+
+
+def make_texts(n_texts: int, n_words: int, seed: int = 0) -> list[str]:
+    # Like bench_matcher.make_text, without loading the vocabulary views
+    with open(VOCAB_CSV_PATH, "r", encoding="utf-8") as f:
+        words = [row["word"] for row in csv.DictReader(f)]
+    rng = random.Random(seed)
+    return [
+        " ".join(
+            rng.choice(words) if rng.random() < 0.4 else rng.choice(FILLER_WORDS)
+            for _ in range(n_words)
+        )
+        for _ in range(n_texts)
+    ]
+
+
+def memory() -> dict:
+    # Sizes from /proc/self/smaps_rollup, in bytes
+    values = {}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "private": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def load(model: bool) -> None:
+    from salsa_spa.lemma_table import get_lemma_table
+    from salsa_spa.text_cleaning import get_nlp
+    from salsa_spa.word_level import get_expression_trie
+
+    if model:
+        get_nlp()
+    get_expression_trie()
+    get_lemma_table()
+
+
+def worker(texts: list[str], model: bool, barrier, results) -> None:
+    from salsa_spa.grader_prob import grade_with_probabilities
+
+    load(model)
+    for text in texts:
+        grade_with_probabilities(text)
+    # A full collection, as a long-running worker eventually does
+    gc.collect()
+    # Measure while every worker is alive, so shared pages are split
+    barrier.wait()
+    results.put(memory())
+    barrier.wait()
+
+
+def run(n_workers: int, start: str, model: bool, freeze: bool, texts: list[str]) -> dict:
+    context = multiprocessing.get_context(start)
+    if start == "fork":
+        load(model)
+        if freeze:
+            gc.freeze()
+    barrier = context.Barrier(n_workers + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(texts, model, barrier, results))
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    parent = memory()
+    workers = [results.get() for _ in processes]
+    barrier.wait()
+    for process in processes:
+        process.join()
+
+    report = {
+        "workers": n_workers,
+        "start": start,
+        "mean_worker_rss_bytes": sum(w["rss"] for w in workers) / n_workers,
+        "mean_worker_pss_bytes": sum(w["pss"] for w in workers) / n_workers,
+        "mean_worker_private_bytes": sum(w["private"] for w in workers) / n_workers,
+        "total_worker_pss_bytes": sum(w["pss"] for w in workers),
+    }
+    if start == "fork":
+        # The parent holds the loaded vocabulary the workers share
+        report["parent_pss_bytes"] = parent["pss"]
+    return report
+
+
+def _run_isolated(n_workers: int, start: str, model: bool, freeze: bool, n_texts: int) -> dict:
+    # Each run in its own interpreter, so fork runs start from a cold parent
+    code = (
+        "import json, bench_workers as b; "
+        f"print(json.dumps(b.run({n_workers}, {start!r}, {model}, {freeze}, b.make_texts({n_texts}, 200))))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--start", nargs="+", default=["spawn", "fork"], choices=["spawn", "fork"])
+    parser.add_argument("--model", action="store_true", help="Also load the spaCy model in every worker")
+    parser.add_argument("--freeze", action="store_true", help="gc.freeze() the parent before forking")
+    parser.add_argument("--texts", type=int, default=20)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = []
+    for start in args.start:
+        for n_workers in args.workers:
+            report.append(_run_isolated(n_workers, start, args.model, args.freeze, args.texts))
+            print(f"{start} x{n_workers} done", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,44 @@
 """
 Spanish text analysis library entry point.
 """
+
+import gc
+from typing import Iterable, Optional
+
+
+def configure_nlp(model_name: Optional[str] = None, exclude: Optional[Iterable[str]] = None) -> None:
+    """
+    Use another spaCy model, or exclude other components from it, e.g.
+    configure_nlp("es_core_news_sm"). The model, the vocabulary and the
+    lemma table are reloaded on next use, since lemmas depend on the model.
+    Defaults come from SALSA_SPACY_MODEL and SALSA_SPACY_EXCLUDE. Worker
+    processes started with "spawn" only see the environment variables.
+    """
+    from .lemma_table import clear_lemma_table
+    from .text_cleaning import set_pipeline
+    from .vocab_lists import clear_vocabulary
+
+    set_pipeline(model_name, exclude)
+    clear_vocabulary()
+    clear_lemma_table()
+
+
+def warmup(freeze: bool = False) -> None:
+    """
+    Load the spaCy model, the vocabulary, the expression matcher and the
+    lemma table now instead of on first use. Importing salsa_spa does none
+    of this.
+
+    In a server that forks its workers after warming up, freeze=True calls
+    gc.freeze() so the workers' garbage collector never writes to the
+    inherited objects and their memory stays shared with the parent.
+    """
+    from .lemma_table import get_lemma_table
+    from .text_cleaning import get_nlp
+    from .word_level import get_expression_trie
+
+    get_nlp()
+    get_expression_trie()
+    get_lemma_table()
+    if freeze:
+        gc.freeze()
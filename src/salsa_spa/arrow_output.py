@@ -0,0 +1,154 @@
+"""
+Columnar output of batch grading results as Parquet or Arrow IPC files.
+Document-level results go to one table, with one column per report field
+and per level probability, and the word-level matches of every document
+to another. Like the word_level_dict returned by grading, the word table
+has one row per distinct expression of a document, in order of first
+occurrence: an expression matched several times appears once, and match
+positions are not recorded. Rows are buffered and written in record batches, so any
+number of documents can be written with bounded memory. Requires the
+optional pyarrow dependency (pip install "salsa-spa[arrow]").
+"""
+
+from typing import Iterable, Optional
+from .grader_prob import ALL_LEVELS
+
+# Rows buffered per record batch
+ARROW_BATCH_SIZE = 65536
+
+_STATS = ("total_words", "unique_words", "unknown_words", "input_length")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            'Arrow and Parquet output need pyarrow: pip install "salsa-spa[arrow]"'
+        ) from e
+    return pyarrow
+
+
+def document_schema():
+    pa = _pyarrow()
+    level = pa.dictionary(pa.int8(), pa.string())
+    return pa.schema(
+        [("id", pa.string()), ("grade", pa.float64()), ("predicted_level", level), ("confidence", pa.float64())]
+        + [(f"probability_{lvl}", pa.float64()) for lvl in ALL_LEVELS]
+        + [(stat, pa.int64()) for stat in _STATS]
+    )
+
+
+def word_schema():
+    pa = _pyarrow()
+    level = pa.dictionary(pa.int8(), pa.string())
+    return pa.schema([("id", pa.string()), ("expression", pa.string()), ("level", level)])
+
+
+class _TableWriter:
+    # Buffers rows column by column and writes them as record batches
+    def __init__(self, path: str, schema, file_format: str, batch_size: int) -> None:
+        pa = _pyarrow()
+        self.schema = schema
+        self.batch_size = batch_size
+        self.columns: dict[str, list] = {name: [] for name in schema.names}
+        self.rows = 0
+        if file_format == "parquet":
+            self._writer = pa.parquet.ParquetWriter(path, schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(path, schema)
+
+    def append(self, row: dict) -> None:
+        for name, values in self.columns.items():
+            values.append(row[name])
+        self.rows += 1
+        if len(self.columns["id"]) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.columns["id"]:
+            return
+        pa = _pyarrow()
+        batch = pa.RecordBatch.from_pydict(self.columns, schema=self.schema)
+        self._writer.write_batch(batch)
+        for values in self.columns.values():
+            values.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+
+class ArrowResultWriter:
+    """
+    Writes grading results to `path` and, if given, their word-level
+    matches to `words_path`, one row per distinct expression. The format is "parquet" or "arrow" (IPC file,
+    readable as Feather); by default it follows the extension of `path`.
+
+        with ArrowResultWriter("grades.parquet", "words.parquet") as writer:
+            for doc_id, (result, word_levels) in zip(ids, grade_many(texts)):
+                writer.write(doc_id, result, word_levels)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        words_path: Optional[str] = None,
+        file_format: Optional[str] = None,
+        batch_size: int = ARROW_BATCH_SIZE,
+    ) -> None:
+        file_format = file_format or ("parquet" if path.endswith(".parquet") else "arrow")
+        if file_format not in ("parquet", "arrow"):
+            raise ValueError(f"file_format must be 'parquet' or 'arrow', not {file_format!r}")
+        self._documents = _TableWriter(path, document_schema(), file_format, batch_size)
+        self._words = (
+            _TableWriter(words_path, word_schema(), file_format, batch_size) if words_path else None
+        )
+
+    def write(self, doc_id: object, result: dict, word_level_dict: Optional[dict] = None) -> None:
+        """Add one document's result and, if a words file is open, its matches."""
+        doc_id = str(doc_id)
+        row = {
+            "id": doc_id,
+            "grade": result["grade"],
+            "predicted_level": result["predicted_level"],
+            "confidence": result["confidence"],
+        }
+        for level in ALL_LEVELS:
+            row[f"probability_{level}"] = result["probabilities"].get(level, 0.0)
+        for stat in _STATS:
+            row[stat] = result["stats"][stat]
+        self._documents.append(row)
+        if self._words is not None and word_level_dict:
+            for expression, level in word_level_dict.items():
+                self._words.append({"id": doc_id, "expression": expression, "level": level})
+
+    @property
+    def documents_written(self) -> int:
+        return self._documents.rows
+
+    def close(self) -> None:
+        self._documents.close()
+        if self._words is not None:
+            self._words.close()
+
+    def __enter__(self) -> "ArrowResultWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_arrow_results(
+    results: Iterable[tuple[object, dict, dict]],
+    path: str,
+    words_path: Optional[str] = None,
+    file_format: Optional[str] = None,
+) -> int:
+    """Write (id, result, word_level_dict) triples; returns the document count."""
+    with ArrowResultWriter(path, words_path=words_path, file_format=file_format) as writer:
+        for doc_id, result, word_level_dict in results:
+            writer.write(doc_id, result, word_level_dict)
+    return writer.documents_written
@@ -0,0 +1,114 @@
+"""
+asyncio interface to grading. Grading is CPU-bound, so AsyncGrader runs it
+on a thread or process pool and awaits the result, and a semaphore caps
+how many texts are graded at once; the event loop itself never blocks.
+"""
+
+import asyncio
+import concurrent.futures
+import weakref
+from functools import partial
+from typing import Iterable, Optional, Union
+from .grader_prob import grade_many, grade_with_probabilities
+
+
+def _grade_list(texts: list[str], batch_size: int) -> list[tuple[dict, dict]]:
+    return list(grade_many(texts, batch_size=batch_size))
+
+
+def _warmup_worker() -> None:
+    from . import warmup
+
+    warmup()
+
+
+class AsyncGrader:
+    """
+    Grades texts from coroutines. `executor` is "thread" (default),
+    "process", or an Executor to use as is; `max_workers` sizes the pool
+    created for "thread" or "process". At most `max_concurrency` calls
+    (default: max_workers, or 4) are submitted at a time; the others wait
+    without blocking the event loop.
+
+        async with AsyncGrader(executor="process", max_workers=4) as grader:
+            result, word_levels = await grader.grade(text)
+    """
+
+    def __init__(
+        self,
+        executor: Union[str, concurrent.futures.Executor] = "thread",
+        max_workers: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        self._owns_executor = isinstance(executor, str)
+        if executor == "thread":
+            self.executor: concurrent.futures.Executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="salsa-grade"
+            )
+        elif executor == "process":
+            # Each worker loads the model and vocabulary before its first task
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_warmup_worker
+            )
+        elif isinstance(executor, concurrent.futures.Executor):
+            self.executor = executor
+        else:
+            raise ValueError(f"executor must be 'thread', 'process' or an Executor, not {executor!r}")
+        self.max_concurrency = max_concurrency or max_workers or 4
+        # A semaphore belongs to one event loop, so each loop gets its own
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with semaphore:
+            return await loop.run_in_executor(self.executor, partial(func, *args))
+
+    async def grade(self, text: str) -> tuple[dict, dict]:
+        """Grade one text, like grade_with_probabilities."""
+        return await self._run(grade_with_probabilities, text)
+
+    async def grade_many(self, texts: Iterable[str], batch_size: int = 64) -> list[tuple[dict, dict]]:
+        """
+        Grade many texts, like grade_many, returning results in input order.
+        Batches of `batch_size` texts are graded concurrently.
+        """
+        texts = list(texts)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = await asyncio.gather(*(self._run(_grade_list, batch, batch_size) for batch in batches))
+        return [result for batch_results in results for result in batch_results]
+
+    async def warmup(self) -> None:
+        """
+        Load the model and vocabulary now, off the event loop. With a
+        process pool, call it before grading: they are loaded in this
+        process first, so workers forked afterwards share them.
+        """
+        if isinstance(self.executor, concurrent.futures.ProcessPoolExecutor):
+            await asyncio.get_running_loop().run_in_executor(None, _warmup_worker)
+        await self._run(_warmup_worker)
+
+    def close(self) -> None:
+        """Shut down the executor if this grader created it."""
+        if self._owns_executor:
+            self.executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> "AsyncGrader":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        # Wait for the workers without blocking the loop
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+_default_grader: Optional[AsyncGrader] = None
+
+
+async def grade_async(text: str) -> tuple[dict, dict]:
+    """Grade a text on a shared thread pool; see AsyncGrader for more control."""
+    global _default_grader
+    if _default_grader is None:
+        _default_grader = AsyncGrader()
+    return await _default_grader.grade(text)
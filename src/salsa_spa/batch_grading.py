@@ -0,0 +1,102 @@
+"""
+Batch grading of corpora: every text file in a directory, or every record
+of a JSONL file. Documents are read lazily, graded with grade_batches
+(optionally across worker processes) and written as one JSON line each
+as soon as their batch is done, or to Parquet/Arrow files (see
+arrow_output).
+"""
+
+import glob
+import json
+import logging
+import os
+from itertools import islice
+from typing import IO, Iterable, Iterator, Optional
+from .file_io import read_text_file
+from .grader_prob import grade_batches
+from .result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+
+def read_text_documents(directory: str, pattern: str = "**/*.txt") -> Iterator[tuple[str, str]]:
+    """
+    Yield (path relative to `directory`, text) for the files matching the
+    glob `pattern`, in sorted order. Unreadable files are skipped.
+    """
+    paths = sorted(glob.glob(os.path.join(glob.escape(directory), pattern), recursive=True))
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        text = read_text_file(filepath=path)
+        if text is None:
+            logger.warning(f"Skipped unreadable file: {path}")
+            continue
+        yield os.path.relpath(path, directory), text
+
+
+def read_jsonl_documents(
+    path: str, text_field: str = "text", id_field: Optional[str] = None
+) -> Iterator[tuple[object, str]]:
+    """
+    Yield (id, text) for the records of a JSONL file. The id is the
+    record's `id_field`, or its line number (from 1) if no field is given.
+    Records without a text are skipped.
+    """
+    skipped = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                skipped += 1
+                continue
+            text = record.get(text_field) if isinstance(record, dict) else None
+            if not isinstance(text, str):
+                skipped += 1
+                continue
+            yield (record.get(id_field) if id_field else line_number), text
+    if skipped:
+        logger.warning(f"Skipped {skipped} lines without a '{text_field}' field")
+
+
+def grade_documents(
+    documents: Iterable[tuple[object, str]],
+    batch_size: int = 64,
+    n_process: int = 1,
+    ordered: bool = True,
+    cache: Optional[ResultCache] = None,
+) -> Iterator[tuple[object, dict, dict]]:
+    """
+    Grade (id, text) pairs, yielding (id, result, word_level_dict). With
+    ordered=False and n_process > 1, results come in the order their
+    batches finish.
+    """
+    ids_per_batch: dict[int, list] = {}
+
+    def batches() -> Iterator[list[str]]:
+        iterator = iter(documents)
+        index = 0
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            ids_per_batch[index] = [doc_id for doc_id, _ in batch]
+            index += 1
+            yield [text for _, text in batch]
+
+    for index, results in grade_batches(batches(), n_process=n_process, cache=cache, ordered=ordered):
+        for doc_id, (result, word_level_dict) in zip(ids_per_batch.pop(index), results):
+            yield doc_id, result, word_level_dict
+
+
+def write_jsonl_results(results: Iterable[tuple[object, dict, dict]], out: IO[str]) -> int:
+    """Write {"id": ..., **result} lines, flushing each one. Returns the count."""
+    count = 0
+    for doc_id, result, _ in results:
+        out.write(json.dumps({"id": doc_id, **result}, ensure_ascii=False) + "\n")
+        out.flush()
+        count += 1
+    return count
@@ -3,16 +3,47 @@ Command-line interface for salsa-spa using Typer.
 """
 
 import os
+import sys
 import logging
 import json
 import typer
-from .file_io import read_text_file, export_to_csv
+from typing import List, Optional
+from .arrow_output import write_arrow_results
+from .batch_grading import grade_documents, read_jsonl_documents, read_text_documents, write_jsonl_results
+from .daemon import (
+    daemon_enabled,
+    daemon_grade,
+    daemon_word_levels,
+    request_daemon,
+    run_daemon,
+    socket_path,
+    start_daemon,
+    stop_daemon,
+)
+from .file_io import read_text_file, export_to_csv, iter_text_chunks
 from .word_level import detect_word_levels
-from .vocab_lists import level_dict
 from .grader_prob import grade_with_probabilities
+from .evaluation import evaluate, read_labeled_corpus
+from .lemma_table import build_corpus_lemmas, corpus_lemmas_path
+from .profiling import Profile
+from .result_cache import ResultCache, result_cache_path
+from .server import serve
+from .streaming import StreamingGrader
+from . import warmup
 
 app = typer.Typer()
-logging.basicConfig(level=logging.INFO, format="%(message)s")
+daemon_app = typer.Typer(
+    help="Keep the model loaded in a background process that grade-text and grade-file use."
+)
+app.add_typer(daemon_app, name="daemon")
+
+
+@app.callback()
+def main() -> None:
+    """
+    SALSA: Spanish Automatic Language Skill Analyzer.
+    """
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
 
 @app.command("grade-file")
@@ -21,33 +52,97 @@ def grade_file(
         ..., "--filepath", help="Path to the text file to grade"
     ),
     output: str = typer.Option(None, "--output", help="Path to save CSV output"),
+    stream: bool = typer.Option(
+        False,
+        "--stream",
+        help="Read and grade the file in chunks with bounded memory, then print the report as JSON",
+    ),
+    chunk_size: int = typer.Option(
+        65536, "--chunk-size", help="Approximate chunk size in characters for --stream"
+    ),
+    profile: bool = typer.Option(
+        False, "--profile", help="Print the time spent in each grading stage as JSON"
+    ),
 ) -> None:
     """
-    Grade a text file and output results to console or CSV.
+    Grade a text file and output results to console or CSV. Uses the
+    grading daemon if it is running, except with --stream.
     """
+    if stream:
+        _grade_file_streaming(
+            filepath=filepath, output=output, chunk_size=chunk_size, profile=profile
+        )
+        return
+
     text = read_text_file(filepath=filepath)
     if text is None:
         logging.error(f"Could not read file: {filepath}")
         raise typer.Exit(code=2)
 
-    word_levels = detect_word_levels(text=text, level_dictionary=level_dict)
+    response = daemon_word_levels(text=text, profile=profile) if daemon_enabled() else None
+    if response is not None:
+        word_levels, timings = response
+    else:
+        profiler = Profile() if profile else None
+        word_levels = detect_word_levels(text=text, profile=profiler)
+        timings = profiler.report() if profiler is not None else None
     for word, level in word_levels:
         logging.info(f"{word}: {level}")
 
     if output is not None:
         export_to_csv(data=word_levels, output_path=output)
         logging.info(f"\n✅ Result saved to {output}")
+    if timings is not None:
+        typer.echo(json.dumps({"timings": timings}, indent=2))
+
+
+def _grade_file_streaming(
+    filepath: str, output: Optional[str], chunk_size: int, profile: bool
+) -> None:
+    chunks = iter_text_chunks(filepath=filepath, chunk_size=chunk_size)
+    if chunks is None:
+        logging.error(f"Could not read file: {filepath}")
+        raise typer.Exit(code=2)
+
+    grader = StreamingGrader(profile=profile)
+
+    def logged_word_levels():
+        for word, level in grader.grade_chunks(chunks):
+            logging.info(f"{word}: {level}")
+            yield word, level
+
+    if output is not None:
+        export_to_csv(data=logged_word_levels(), output_path=output)
+        logging.info(f"\n✅ Result saved to {output}")
+    else:
+        for _ in logged_word_levels():
+            pass
+    typer.echo(json.dumps(grader.result(), ensure_ascii=False, indent=2))
 
 
 @app.command("grade-text")
 def grade_text(
     text: str = typer.Option(..., "--text", help="Text to grade"),
     output: str = typer.Option(None, "--output", help="Path to save JSON output"),
+    profile: bool = typer.Option(
+        False, "--profile", help="Add the time spent in each grading stage to the result"
+    ),
+    cache: bool = typer.Option(
+        False, "--cache", help="Reuse and store results in the result cache"
+    ),
 ) -> None:
     """
-    Grade a string of text and output results as JSON.
+    Grade a string of text and output results as JSON. Uses the grading
+    daemon if it is running.
     """
-    result, _ = grade_with_probabilities(text=text)
+    result = None
+    if daemon_enabled():
+        result = daemon_grade(
+            text=text, profile=profile, cache=result_cache_path() if cache else None
+        )
+    if result is None:
+        result_cache = ResultCache() if cache else None
+        result, _ = grade_with_probabilities(text=text, profile=profile, cache=result_cache)
     if output is not None:
         with open(output, "w", encoding="utf-8") as f:
             json.dump(result, f, ensure_ascii=False, indent=2)
@@ -55,5 +150,263 @@ def grade_text(
         typer.echo(json.dumps(result, ensure_ascii=False, indent=2))
 
 
+@app.command("warmup")
+def warmup_command() -> None:
+    """
+    Load the spaCy model and build the vocabulary cache ahead of time.
+    """
+    warmup()
+    logging.info("✅ Model and vocabulary are ready")
+
+
+@app.command("build-lemma-table")
+def build_lemma_table(
+    corpus: List[str] = typer.Option(
+        ..., "--corpus", help="Text file whose words are added to the lemma table (repeatable)"
+    ),
+) -> None:
+    """
+    Precompute lemmas for the words of local text files so grading them
+    does not need to run spaCy.
+    """
+    new_forms = build_corpus_lemmas(paths=corpus)
+    logging.info(f"✅ Added {new_forms} forms to {corpus_lemmas_path()}")
+
+
+@app.command("evaluate")
+def evaluate_command(
+    input_path: str = typer.Option(
+        ..., "--input", help="Labeled corpus (.jsonl or .csv) with text and category fields"
+    ),
+    output: str = typer.Option(None, "--output", help="Path to save the JSON report"),
+    workers: int = typer.Option(
+        os.cpu_count() or 1, "--workers", help="Number of grading worker processes"
+    ),
+    batch_size: int = typer.Option(64, "--batch-size", help="Texts per batch sent to a worker"),
+    text_field: str = typer.Option("text", "--text-field", help="Name of the text field"),
+    label_field: str = typer.Option("category", "--label-field", help="Name of the CEFR label field"),
+    cache: bool = typer.Option(
+        False, "--cache", help="Reuse and store results in the result cache"
+    ),
+) -> None:
+    """
+    Grade a local labeled corpus and report accuracy, the confusion matrix,
+    mean grade per level and throughput.
+    """
+    if not os.path.exists(input_path):
+        logging.error(f"Could not read file: {input_path}")
+        raise typer.Exit(code=2)
+    samples = read_labeled_corpus(path=input_path, text_field=text_field, label_field=label_field)
+    result_cache = ResultCache() if cache else None
+    report = evaluate(samples=samples, batch_size=batch_size, n_process=workers, cache=result_cache)
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logging.info(f"✅ Report saved to {output}")
+    else:
+        typer.echo(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def _write_graded_documents(
+    documents,
+    output: Optional[str],
+    workers: int,
+    batch_size: int,
+    ordered: bool,
+    cache: bool,
+    output_format: str = "jsonl",
+    words_output: Optional[str] = None,
+) -> None:
+    if output_format not in ("jsonl", "parquet", "arrow"):
+        logging.error(f"Unknown format: {output_format} (expected jsonl, parquet or arrow)")
+        raise typer.Exit(code=2)
+    if output_format != "jsonl" and output is None:
+        logging.error(f"--format {output_format} needs --output")
+        raise typer.Exit(code=2)
+    if output_format == "jsonl" and words_output is not None:
+        logging.error("--words-output needs --format parquet or arrow")
+        raise typer.Exit(code=2)
+
+    results = grade_documents(
+        documents,
+        batch_size=batch_size,
+        n_process=workers,
+        ordered=ordered,
+        cache=ResultCache() if cache else None,
+    )
+    if output_format != "jsonl":
+        count = write_arrow_results(
+            results, output, words_path=words_output, file_format=output_format
+        )
+    elif output is None:
+        write_jsonl_results(results, sys.stdout)
+        return
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            count = write_jsonl_results(results, f)
+    logging.info(f"✅ {count} results saved to {output}")
+
+
+@app.command("grade-dir")
+def grade_dir(
+    directory: str = typer.Option(..., "--dir", help="Directory of text files to grade"),
+    pattern: str = typer.Option(
+        "**/*.txt", "--pattern", help="Glob pattern of the files to grade, relative to --dir"
+    ),
+    output: str = typer.Option(None, "--output", help="Path to save JSONL output (default: stdout)"),
+    workers: int = typer.Option(1, "--workers", help="Number of grading worker processes"),
+    batch_size: int = typer.Option(64, "--batch-size", help="Files per batch sent to a worker"),
+    ordered: bool = typer.Option(
+        False, "--ordered", help="Write results in file order instead of as they complete"
+    ),
+    cache: bool = typer.Option(
+        False, "--cache", help="Reuse and store results in the result cache"
+    ),
+    output_format: str = typer.Option(
+        "jsonl", "--format", help="Output format: jsonl, parquet or arrow (needs pyarrow)"
+    ),
+    words_output: str = typer.Option(
+        None,
+        "--words-output",
+        help="Path to save each document's distinct word-level matches (parquet or arrow format)",
+    ),
+) -> None:
+    """
+    Grade every matching file of a directory, writing one JSON line per
+    file with its relative path as "id".
+    """
+    if not os.path.isdir(directory):
+        logging.error(f"Not a directory: {directory}")
+        raise typer.Exit(code=2)
+    documents = read_text_documents(directory=directory, pattern=pattern)
+    _write_graded_documents(
+        documents, output, workers, batch_size, ordered, cache, output_format, words_output
+    )
+
+
+@app.command("grade-jsonl")
+def grade_jsonl(
+    input_path: str = typer.Option(..., "--input", help="JSONL file with one document per line"),
+    output: str = typer.Option(None, "--output", help="Path to save JSONL output (default: stdout)"),
+    text_field: str = typer.Option("text", "--text-field", help="Name of the text field"),
+    id_field: str = typer.Option(
+        None, "--id-field", help="Field copied to the output \"id\" (default: the line number)"
+    ),
+    workers: int = typer.Option(1, "--workers", help="Number of grading worker processes"),
+    batch_size: int = typer.Option(64, "--batch-size", help="Documents per batch sent to a worker"),
+    ordered: bool = typer.Option(
+        False, "--ordered", help="Write results in input order instead of as they complete"
+    ),
+    cache: bool = typer.Option(
+        False, "--cache", help="Reuse and store results in the result cache"
+    ),
+    output_format: str = typer.Option(
+        "jsonl", "--format", help="Output format: jsonl, parquet or arrow (needs pyarrow)"
+    ),
+    words_output: str = typer.Option(
+        None,
+        "--words-output",
+        help="Path to save each document's distinct word-level matches (parquet or arrow format)",
+    ),
+) -> None:
+    """
+    Grade every record of a JSONL file, writing one JSON line per record.
+    """
+    if not os.path.exists(input_path):
+        logging.error(f"Could not read file: {input_path}")
+        raise typer.Exit(code=2)
+    documents = read_jsonl_documents(path=input_path, text_field=text_field, id_field=id_field)
+    _write_graded_documents(
+        documents, output, workers, batch_size, ordered, cache, output_format, words_output
+    )
+
+
+@app.command("serve")
+def serve_command(
+    host: str = typer.Option("127.0.0.1", "--host", help="Address to listen on"),
+    port: int = typer.Option(8000, "--port", help="Port to listen on"),
+    max_batch_size: int = typer.Option(
+        32, "--max-batch-size", help="Maximum number of texts graded together"
+    ),
+    max_wait_ms: float = typer.Option(
+        5.0, "--max-wait-ms", help="Maximum time a request waits for its batch to fill"
+    ),
+) -> None:
+    """
+    Serve grading over HTTP with the model and vocabulary kept loaded.
+    """
+    serve(host=host, port=port, max_batch_size=max_batch_size, max_wait=max_wait_ms / 1000)
+
+
+@daemon_app.command("start")
+def daemon_start(
+    socket: str = typer.Option(
+        None, "--socket", help="Socket path (default: $SALSA_DAEMON_SOCKET or the cache directory)"
+    ),
+    idle_timeout: float = typer.Option(
+        None, "--idle-timeout", help="Stop after this many seconds without requests"
+    ),
+) -> None:
+    """
+    Start the grading daemon in the background and wait until it is ready.
+    """
+    try:
+        status = start_daemon(path=socket, idle_timeout=idle_timeout)
+    except RuntimeError as e:
+        logging.error(str(e))
+        raise typer.Exit(code=1)
+    logging.info(f"✅ Grading daemon {status['pid']} listening on {status['socket']}")
+
+
+@daemon_app.command("run")
+def daemon_run(
+    socket: str = typer.Option(
+        None, "--socket", help="Socket path (default: $SALSA_DAEMON_SOCKET or the cache directory)"
+    ),
+    idle_timeout: float = typer.Option(
+        None, "--idle-timeout", help="Stop after this many seconds without requests"
+    ),
+) -> None:
+    """
+    Run the grading daemon in the foreground until interrupted.
+    """
+    try:
+        run_daemon(path=socket, idle_timeout=idle_timeout)
+    except RuntimeError as e:
+        logging.error(str(e))
+        raise typer.Exit(code=1)
+
+
+@daemon_app.command("stop")
+def daemon_stop(
+    socket: str = typer.Option(
+        None, "--socket", help="Socket path (default: $SALSA_DAEMON_SOCKET or the cache directory)"
+    ),
+) -> None:
+    """
+    Stop the grading daemon.
+    """
+    if stop_daemon(path=socket):
+        logging.info("✅ Grading daemon stopped")
+    else:
+        logging.info(f"No grading daemon is listening on {socket or socket_path()}")
+
+
+@daemon_app.command("status")
+def daemon_status(
+    socket: str = typer.Option(
+        None, "--socket", help="Socket path (default: $SALSA_DAEMON_SOCKET or the cache directory)"
+    ),
+) -> None:
+    """
+    Print the status of the grading daemon as JSON; exits with 1 if it is not running.
+    """
+    status = request_daemon({"command": "status"}, path=socket)
+    if status is None:
+        logging.info(f"No grading daemon is listening on {socket or socket_path()}")
+        raise typer.Exit(code=1)
+    typer.echo(json.dumps(status, ensure_ascii=False, indent=2))
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,346 @@
+"""
+Resident grading daemon for the CLI. `salsa_spa daemon start` keeps the
+spaCy model and the vocabulary loaded in a background process listening on
+a Unix socket. grade-text and grade-file send their text to it when it is
+running and grade in process otherwise, so repeated invocations skip
+loading the model. Requests and responses are single JSON lines; a request
+is only served if the daemon runs the same library version and spaCy
+pipeline as the client. The socket is only accessible to its owner.
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+from .file_io import get_cache_dir
+from .grader_prob import grade_with_probabilities
+from .profiling import Profile
+from .result_cache import ResultCache
+from .server import MicroBatcher
+from .text_cleaning import get_pipeline
+from .vocab_index import package_version
+from .word_level import detect_word_levels
+from . import warmup
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the daemon to accept a connection before grading in process
+CONNECT_TIMEOUT = 1.0
+
+# Seconds to wait for a response before grading in process; a daemon that
+# is stuck must not make the CLI hang
+REQUEST_TIMEOUT = float(os.environ.get("SALSA_DAEMON_TIMEOUT", "60"))
+
+# Seconds `start_daemon` waits for a new daemon to load the model
+START_TIMEOUT = 120.0
+
+
+def socket_path() -> str:
+    """Path of the daemon socket: $SALSA_DAEMON_SOCKET, or daemon.sock in the cache directory."""
+    return os.environ.get("SALSA_DAEMON_SOCKET") or os.path.join(get_cache_dir(), "daemon.sock")
+
+
+def daemon_enabled() -> bool:
+    """Whether the CLI may use a running daemon; SALSA_DAEMON=0 turns it off."""
+    return os.environ.get("SALSA_DAEMON", "1") != "0"
+
+
+def _identity() -> dict:
+    # What a response depends on besides the request itself
+    model_name, exclude = get_pipeline()
+    return {"version": package_version("salsa-spa"), "pipeline": [model_name, list(exclude)]}
+
+
+class GradingDaemon(socketserver.ThreadingUnixStreamServer):
+    """Unix socket server that grades the texts sent by CLI invocations."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, batcher: MicroBatcher) -> None:
+        super().__init__(path, DaemonRequestHandler)
+        self.path = path
+        self.batcher = batcher
+        self.identity = _identity()
+        self.requests = 0
+        self.started = time.time()
+        self.last_request = time.monotonic()
+        self._caches: dict[str, ResultCache] = {}
+        self._lock = threading.Lock()
+
+    def _cache(self, path: str) -> ResultCache:
+        # One ResultCache per database the clients ask for
+        with self._lock:
+            cache = self._caches.get(path)
+            if cache is None:
+                cache = self._caches[path] = ResultCache(path=path)
+            return cache
+
+    def respond(self, request: dict) -> dict:
+        command = request.get("command")
+        with self._lock:
+            self.requests += 1
+            self.last_request = time.monotonic()
+        if command == "status":
+            return {
+                "status": "ok",
+                "pid": os.getpid(),
+                "socket": self.path,
+                "requests": self.requests,
+                "uptime": time.time() - self.started,
+                **self.identity,
+            }
+        if command == "stop":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"status": "stopping"}
+
+        identity = {name: request.get(name) for name in self.identity}
+        if identity != self.identity:
+            return {"error": f"Daemon runs {self.identity}, not {identity}", "mismatch": True}
+        text = request.get("text")
+        if not isinstance(text, str):
+            return {"error": "text must be a string"}
+
+        if command == "grade":
+            cache_path = request.get("cache")
+            if request.get("profile") or cache_path:
+                cache = self._cache(cache_path) if cache_path else None
+                result, _ = grade_with_probabilities(
+                    text, profile=bool(request.get("profile")), cache=cache
+                )
+            else:
+                result, _ = self.batcher.submit(text).result()
+            return {"result": result}
+        if command == "word-levels":
+            profiler = Profile() if request.get("profile") else None
+            word_levels = detect_word_levels(text=text, profile=profiler)
+            return {
+                "word_levels": word_levels,
+                "timings": profiler.report() if profiler is not None else None,
+            }
+        return {"error": f"Unknown command: {command!r}"}
+
+    def server_close(self) -> None:
+        super().server_close()
+        for cache in self._caches.values():
+            cache.close()
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Answers each JSON line received on a connection with one JSON line."""
+
+    server: GradingDaemon
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise TypeError("request must be a JSON object")
+                response = self.server.respond(request)
+            except Exception as e:
+                logger.exception("Error handling daemon request")
+                response = {"error": str(e)}
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+def make_daemon(
+    path: Optional[str] = None,
+    max_batch_size: int = 32,
+    max_wait: float = 0.005,
+) -> GradingDaemon:
+    """
+    Load the model and vocabulary and bind the daemon socket, replacing a
+    stale socket file. Raises RuntimeError if a daemon already listens on it.
+    """
+    path = path or socket_path()
+    if request_daemon({"command": "status"}, path=path) is not None:
+        raise RuntimeError(f"A daemon is already listening on {path}")
+    warmup()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    if os.path.exists(path):
+        os.unlink(path)
+    # Only the owner may connect
+    umask = os.umask(0o177)
+    try:
+        return GradingDaemon(path, MicroBatcher(max_batch_size=max_batch_size, max_wait=max_wait))
+    finally:
+        os.umask(umask)
+
+
+def run_daemon(path: Optional[str] = None, idle_timeout: Optional[float] = None) -> None:
+    """Serve until stopped, or until no request arrived for `idle_timeout` seconds."""
+    daemon = make_daemon(path)
+    inode = os.stat(daemon.path).st_ino
+
+    def stop_when_idle() -> None:
+        while True:
+            idle = time.monotonic() - daemon.last_request
+            if idle >= idle_timeout:
+                logger.info(f"No requests for {idle_timeout:g}s, stopping")
+                daemon.shutdown()
+                return
+            time.sleep(min(idle_timeout - idle, 1.0) + 0.01)
+
+    def exit_on_signal(signum, frame) -> None:
+        raise SystemExit(0)
+
+    if idle_timeout:
+        threading.Thread(target=stop_when_idle, daemon=True).start()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, exit_on_signal)
+    logger.info(f"Grading daemon {os.getpid()} listening on {daemon.path}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+        daemon.batcher.close()
+        # Leave the socket of a daemon started since then in place
+        try:
+            if os.stat(daemon.path).st_ino == inode:
+                os.unlink(daemon.path)
+        except FileNotFoundError:
+            pass
+
+
+def request_daemon(
+    request: dict, path: Optional[str] = None, timeout: Optional[float] = None
+) -> Optional[dict]:
+    """
+    Send one request to the daemon and return its response, or None if no
+    daemon is listening, the connection fails, no response arrives within
+    `timeout` seconds (default: REQUEST_TIMEOUT) or the response is not a
+    complete JSON object.
+    """
+    if timeout is None:
+        timeout = REQUEST_TIMEOUT
+    path = path or socket_path()
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(path)
+            sock.settimeout(timeout)
+            sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as f:
+                line = f.readline()
+    except OSError as e:
+        # Including socket.timeout
+        logger.debug(f"Grading daemon unavailable on {path}: {e}")
+        return None
+    try:
+        response = json.loads(line)
+    except ValueError:
+        # Empty, cut short or garbled, e.g. the daemon died while answering
+        logger.debug(f"Invalid response from the grading daemon: {line[:200]!r}")
+        return None
+    return response if isinstance(response, dict) else None
+
+
+def _request_grading(request: dict, path: Optional[str]) -> Optional[dict]:
+    # Any failure means grading in process instead, where a genuine error
+    # is raised as usual
+    response = request_daemon({**request, **_identity()}, path=path)
+    if response is None:
+        return None
+    if "error" in response:
+        if response.get("mismatch"):
+            logger.warning(f"Grading in process: {response['error']}")
+        else:
+            logger.debug(f"Grading daemon error: {response['error']}")
+        return None
+    return response
+
+
+def daemon_grade(
+    text: str,
+    profile: bool = False,
+    cache: Optional[str] = None,
+    path: Optional[str] = None,
+) -> Optional[dict]:
+    """
+    Grade a text on the running daemon, like grade_with_probabilities, using
+    the result cache database at `cache` if given. Returns None if no
+    compatible daemon answered.
+    """
+    response = _request_grading(
+        {"command": "grade", "text": text, "profile": profile, "cache": cache}, path
+    )
+    return response.get("result") if response is not None else None
+
+
+def daemon_word_levels(
+    text: str, profile: bool = False, path: Optional[str] = None
+) -> Optional[tuple[list[tuple[str, str]], Optional[dict]]]:
+    """
+    Run detect_word_levels on the running daemon, returning (word_levels,
+    timings or None). Returns None if no compatible daemon answered.
+    """
+    response = _request_grading({"command": "word-levels", "text": text, "profile": profile}, path)
+    if response is None:
+        return None
+    try:
+        word_levels = [(word, level) for word, level in response["word_levels"]]
+    except (KeyError, TypeError, ValueError):
+        return None
+    return word_levels, response.get("timings")
+
+
+def start_daemon(
+    path: Optional[str] = None,
+    idle_timeout: Optional[float] = None,
+    timeout: float = START_TIMEOUT,
+) -> dict:
+    """
+    Start a daemon in the background and wait until it answers; returns its
+    status. Its log goes to daemon.log next to the socket. Raises
+    RuntimeError if it exits or does not answer within `timeout` seconds.
+    """
+    path = os.path.abspath(path or socket_path())
+    status = request_daemon({"command": "status"}, path=path)
+    if status is not None:
+        return status
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    command = [sys.executable, "-m", "salsa_spa.cli", "daemon", "run", "--socket", path]
+    if idle_timeout:
+        command += ["--idle-timeout", str(idle_timeout)]
+    log_path = os.path.join(os.path.dirname(path), "daemon.log")
+    with open(log_path, "ab") as log:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = request_daemon({"command": "status"}, path=path, timeout=CONNECT_TIMEOUT)
+        if status is not None:
+            return status
+        if process.poll() is not None:
+            raise RuntimeError(f"Daemon exited with code {process.returncode}, see {log_path}")
+        time.sleep(0.1)
+    raise RuntimeError(f"Daemon did not answer within {timeout:g}s, see {log_path}")
+
+
+def stop_daemon(path: Optional[str] = None, timeout: float = 10.0) -> bool:
+    """Stop the running daemon; returns False if none was running."""
+    path = path or socket_path()
+    if request_daemon({"command": "stop"}, path=path, timeout=timeout) is None:
+        return False
+    # The socket is removed once the daemon has shut down
+    deadline = time.monotonic() + timeout
+    while os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return True
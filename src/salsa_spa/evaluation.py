@@ -0,0 +1,115 @@
+"""
+Offline evaluation of CEFR grading against a local labeled corpus.
+Reads (text, category) samples from a JSONL or CSV file, grades them with
+grade_many across worker processes, and reports accuracy, the confusion
+matrix, the mean grade per level and throughput.
+"""
+
+import csv
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from typing import Iterable, Iterator, Optional
+from .grader_prob import ALL_LEVELS, grade_many
+from .result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+
+def read_labeled_corpus(
+    path: str, text_field: str = "text", label_field: str = "category"
+) -> Iterator[tuple[str, str]]:
+    """
+    Yield (text, category) pairs from a .jsonl or .csv file.
+    Rows missing either field, and JSONL lines that are not a JSON object,
+    are skipped.
+    """
+    skipped = 0
+
+    def jsonl_rows(f) -> Iterator[dict]:
+        nonlocal skipped
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            if not isinstance(row, dict):
+                skipped += 1
+                continue
+            yield row
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows: Iterable[dict] = csv.DictReader(f) if path.endswith(".csv") else jsonl_rows(f)
+        for row in rows:
+            text, label = row.get(text_field), row.get(label_field)
+            if not isinstance(text, str) or not label:
+                skipped += 1
+                continue
+            yield text, str(label)
+    if skipped:
+        logger.warning(
+            f"Skipped {skipped} rows that are invalid or lack '{text_field}' and '{label_field}'"
+        )
+
+
+def evaluate(
+    samples: Iterable[tuple[str, str]],
+    batch_size: int = 64,
+    n_process: int = 1,
+    cache: Optional[ResultCache] = None,
+) -> dict:
+    """
+    Grade labeled samples and compare predicted levels with the labels.
+    Samples are read lazily, so the corpus does not need to fit in memory.
+    """
+    labels: list[str] = []
+
+    def texts() -> Iterator[str]:
+        for text, label in samples:
+            labels.append(label)
+            yield text
+
+    confusion: dict[str, Counter] = defaultdict(Counter)
+    grade_sums: Counter = Counter()
+    total_words = 0
+    start = time.perf_counter()
+    graded = grade_many(texts(), batch_size=batch_size, n_process=n_process, cache=cache)
+    for i, (result, _) in enumerate(graded):
+        label = labels[i]
+        confusion[label][result["predicted_level"]] += 1
+        grade_sums[label] += result["grade"]
+        total_words += result["stats"]["total_words"]
+    seconds = time.perf_counter() - start
+
+    n_samples = len(labels)
+    correct = sum(confusion[label][label] for label in confusion)
+    order = {level: i for i, level in enumerate(ALL_LEVELS)}
+    levels = sorted(confusion, key=lambda level: (order.get(level, len(order)), level))
+    per_level = {}
+    for level in levels:
+        n_level = sum(confusion[level].values())
+        per_level[level] = {
+            "n_samples": n_level,
+            "accuracy": confusion[level][level] / n_level,
+            "mean_grade": grade_sums[level] / n_level,
+        }
+
+    return {
+        "n_samples": n_samples,
+        "accuracy": correct / n_samples if n_samples else 0.0,
+        "per_level": per_level,
+        # confusion_matrix[label][predicted_level] = count
+        "confusion_matrix": {
+            level: {predicted: confusion[level][predicted] for predicted in ALL_LEVELS}
+            for level in levels
+        },
+        "throughput": {
+            "seconds": seconds,
+            "texts_per_s": n_samples / seconds if seconds else None,
+            "words_per_s": total_words / seconds if seconds else None,
+            "n_process": n_process,
+        },
+    }
@@ -0,0 +1,161 @@
+"""
+Compact, integer-interned trie over lemmatized vocabulary expressions.
+Every distinct lemma gets an integer ID, and the trie is stored in flat
+arrays instead of one object per node, so the vocabulary takes a fraction
+of the memory of nested dicts of sets and the matcher works on integer
+token streams.
+"""
+
+from array import array
+from typing import Iterator, Optional
+
+# CEFR level order (highest to lowest)
+LEVEL_ORDER = ["C2", "C1", "B2", "B1", "A2", "A1", "A0"]
+
+# Marks a lemma that is not in the vocabulary, or a missing child
+NO_ID = -1
+
+
+class ExpressionTrie:
+    """
+    Token-level trie over lemmatized vocabulary expressions, with lemmas
+    interned to integer IDs (see encode()).
+
+    Nodes are numbered from 0 (the root). The children of node n are
+    child_lemmas/child_nodes[first_child[n]:first_child[n + 1]], sorted by
+    lemma ID; the root's children are also indexed directly by lemma ID in
+    root_children. masks[n] has bit i set if the expression ending at n
+    belongs to LEVEL_ORDER[i], and best[n] is the index of the highest of
+    those levels, or -1. max_length is the number of lemmas in the longest
+    expression.
+    """
+
+    __slots__ = (
+        "lemmas",
+        "lemma_ids",
+        "root_children",
+        "first_child",
+        "child_lemmas",
+        "child_nodes",
+        "masks",
+        "best",
+        "max_length",
+    )
+
+    def __init__(
+        self,
+        lemmas: list[str],
+        first_child: array,
+        child_lemmas: array,
+        child_nodes: array,
+        masks: array,
+        best: Optional[array] = None,
+        root_children: Optional[array] = None,
+        max_length: Optional[int] = None,
+    ) -> None:
+        # best, root_children and max_length are derived from the node
+        # arrays unless given, e.g. when read from the vocabulary index
+        self.lemmas = lemmas
+        self.lemma_ids = {lemma: i for i, lemma in enumerate(lemmas)}
+        self.first_child = first_child
+        self.child_lemmas = child_lemmas
+        self.child_nodes = child_nodes
+        self.masks = masks
+        if best is None:
+            best = array("b", ((m & -m).bit_length() - 1 for m in masks))
+        self.best = best
+        if root_children is None:
+            root_children = array("i", [NO_ID]) * len(lemmas)
+            for i in range(first_child[0], first_child[1]):
+                root_children[child_lemmas[i]] = child_nodes[i]
+        self.root_children = root_children
+        if max_length is None:
+            # Nodes are numbered breadth-first, so parents come before children
+            depth = [0] * len(masks)
+            for node in range(len(masks)):
+                for i in range(first_child[node], first_child[node + 1]):
+                    depth[child_nodes[i]] = depth[node] + 1
+            max_length = max(depth)
+        self.max_length = max_length
+
+    def encode(self, lemmas: list[str]) -> list[int]:
+        """Map lemmas to their IDs; lemmas not in the vocabulary map to NO_ID."""
+        get = self.lemma_ids.get
+        return [get(lemma, NO_ID) for lemma in lemmas]
+
+    def children(self, node: int) -> Iterator[tuple[int, int]]:
+        """Yield (lemma ID, child node) pairs of `node`."""
+        for i in range(self.first_child[node], self.first_child[node + 1]):
+            yield self.child_lemmas[i], self.child_nodes[i]
+
+    def expressions(self) -> Iterator[tuple[str, int]]:
+        """Yield (expression, level mask) for every expression in the trie."""
+        stack: list[tuple[int, tuple[str, ...]]] = [(0, ())]
+        while stack:
+            node, path = stack.pop()
+            if self.masks[node]:
+                yield " ".join(path), self.masks[node]
+            for lemma_id, child in self.children(node):
+                stack.append((child, path + (self.lemmas[lemma_id],)))
+
+    def level_dict_by_length(self) -> dict[str, dict[int, set[str]]]:
+        """Rebuild the level -> length -> expressions mapping the trie was built from."""
+        result: dict[str, dict[int, set[str]]] = {}
+        for expression, mask in self.expressions():
+            length = expression.count(" ") + 1
+            for i, level in enumerate(LEVEL_ORDER):
+                if mask & (1 << i):
+                    result.setdefault(level, {}).setdefault(length, set()).add(expression)
+        return result
+
+    def nbytes(self) -> int:
+        """Approximate size of the node arrays, excluding the lemma strings."""
+        arrays = (
+            self.root_children,
+            self.first_child,
+            self.child_lemmas,
+            self.child_nodes,
+            self.masks,
+            self.best,
+        )
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+def build_expression_trie(
+    level_dict_by_length: dict[str, dict[int, set[str]]]
+) -> ExpressionTrie:
+    """Build an ExpressionTrie from a level -> length -> expressions mapping."""
+    # Level membership of every expression, as a bit mask over LEVEL_ORDER
+    expression_masks: dict[tuple[str, ...], int] = {}
+    for i, level in enumerate(LEVEL_ORDER):
+        for expressions in level_dict_by_length.get(level, {}).values():
+            for expression in expressions:
+                key = tuple(expression.split(" "))
+                expression_masks[key] = expression_masks.get(key, 0) | (1 << i)
+
+    lemmas = sorted({lemma for key in expression_masks for lemma in key})
+    lemma_ids = {lemma: i for i, lemma in enumerate(lemmas)}
+
+    # Temporary nested-dict trie: node = [children by lemma ID, mask]
+    root: list = [{}, 0]
+    for key, mask in expression_masks.items():
+        node = root
+        for lemma in key:
+            node = node[0].setdefault(lemma_ids[lemma], [{}, 0])
+        node[1] |= mask
+
+    # Number the nodes breadth-first and lay their children out in flat arrays
+    first_child = array("I")
+    child_lemmas = array("I")
+    child_nodes = array("I")
+    masks = array("B")
+    nodes = [root]
+    for node in nodes:
+        first_child.append(len(child_lemmas))
+        masks.append(node[1])
+        for lemma_id in sorted(node[0]):
+            child_lemmas.append(lemma_id)
+            child_nodes.append(len(nodes))
+            nodes.append(node[0][lemma_id])
+    first_child.append(len(child_lemmas))
+    return ExpressionTrie(lemmas, first_child, child_lemmas, child_nodes, masks)
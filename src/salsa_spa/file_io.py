@@ -4,9 +4,24 @@ File I/O utilities for reading and writing text and CSV files.
 
 import csv
 import logging
-from typing import Optional
+import os
+import re
+import tempfile
+from typing import Iterable, Iterator, Optional
 
-logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def get_cache_dir() -> str:
+    # Directory for salsa-spa caches: $SALSA_CACHE_DIR if set, otherwise
+    # salsa_spa under $XDG_CACHE_HOME (default ~/.cache)
+    cache_dir = os.environ.get("SALSA_CACHE_DIR")
+    if not cache_dir:
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        cache_dir = os.path.join(cache_home, "salsa_spa")
+    return cache_dir
 
 
 def read_text_file(filepath: str) -> Optional[str]:
@@ -15,8 +30,76 @@ def read_text_file(filepath: str) -> Optional[str]:
         with open(filepath, "r", encoding="utf-8") as file:
             return file.read()
     except Exception as e:
-        logging.error(f"Error reading file: {e}")
+        logger.error(f"Error reading file: {e}")
+        return None
+
+
+# Preferred places to cut a chunk: paragraph break, sentence end, any whitespace
+_CHUNK_BOUNDARIES = [re.compile(r"\n\s*\n"), re.compile(r"[.!?…]\s"), re.compile(r"\s")]
+
+
+def iter_text_chunks(filepath: str, chunk_size: int = 65536) -> Optional[Iterator[str]]:
+    # Open a text file and return an iterator over chunks of roughly chunk_size
+    # characters, cut at paragraph or sentence boundaries and never inside a
+    # word. Concatenating the chunks gives back the file content.
+    try:
+        file = open(filepath, "r", encoding="utf-8")
+    except Exception as e:
+        logger.error(f"Error reading file: {e}")
         return None
+    return _read_chunks(file, chunk_size)
+
+
+def _read_chunks(file, chunk_size: int) -> Iterator[str]:
+    with file:
+        buffer = ""
+        while True:
+            block = file.read(chunk_size)
+            if not block:
+                break
+            buffer += block
+            if len(buffer) < chunk_size:
+                continue
+            cut = _find_chunk_cut(buffer)
+            if cut > 0:
+                yield buffer[:cut]
+                buffer = buffer[cut:]
+        if buffer:
+            yield buffer
+
+
+def _find_chunk_cut(buffer: str) -> int:
+    # Position right after the last preferred boundary in the second half of
+    # the buffer; falls back to the last whitespace anywhere, or 0 if none
+    half = len(buffer) // 2
+    for pattern in _CHUNK_BOUNDARIES:
+        cut = _last_match_end(pattern, buffer, half)
+        if cut > 0:
+            return cut
+    return _last_match_end(_CHUNK_BOUNDARIES[-1], buffer, 0)
+
+
+def _last_match_end(pattern: re.Pattern, text: str, start: int) -> int:
+    cut = 0
+    for match in pattern.finditer(text, start):
+        cut = match.end()
+    return cut
+
+
+def write_file_atomic(path: str, chunks: Iterable[bytes]) -> None:
+    # Write bytes under a temporary name in the same directory and rename
+    # into place, so concurrent readers never see a partial file
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.writelines(chunks)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
 
 def write_text_file(filepath: str, content: str) -> None:
@@ -24,18 +107,18 @@ def write_text_file(filepath: str, content: str) -> None:
     try:
         with open(filepath, "w", encoding="utf-8") as file:
             file.write(content)
-        logging.info(f"Text saved to: {filepath}")
+        logger.info(f"Text saved to: {filepath}")
     except Exception as e:
-        logging.error(f"Error writing file: {e}")
+        logger.error(f"Error writing file: {e}")
 
 
-def export_to_csv(data: list[tuple[str, str]], output_path: str) -> None:
+def export_to_csv(data: Iterable[tuple[str, str]], output_path: str) -> None:
     # Export results to a CSV file
     try:
         with open(output_path, mode="w", newline="", encoding="utf-8") as file:
             writer = csv.writer(file)
             writer.writerow(["Word", "CEFR Level"])
             writer.writerows(data)
-        logging.info(f"Results saved to {output_path}")
+        logger.info(f"Results saved to {output_path}")
     except Exception as e:
-        logging.error(f"Error exporting CSV: {e}")
+        logger.error(f"Error exporting CSV: {e}")
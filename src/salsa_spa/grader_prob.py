@@ -3,25 +3,295 @@ Grading and probability calculation for CEFR levels.
 """
 
 from collections import Counter
+from functools import partial
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+import gc
 import math
-from .word_level import detect_word_levels
-from .vocab_lists import level_dict
+import multiprocessing
+import queue
+from .lemma_table import get_lemma_table, lemmatize_words
+from .profiling import Profile
+from .text_cleaning import extract_words, get_nlp
+from .word_level import detect_word_levels, get_expression_trie, match_word_levels
+from .vocab_lists import get_vocabulary_trie
 
+if TYPE_CHECKING:
+    from .result_cache import ResultCache
 
-def grade_with_probabilities(text: str) -> tuple[dict, dict]:
-    # Get word-level CEFR assignments
-    word_levels = detect_word_levels(text=text, level_dictionary=level_dict)
-    levels = [level for _, level in word_levels]
-    total_words = len(levels)
-    unique_words = len(set([w for w, _ in word_levels]))
-    unknown_words = sum(1 for l in levels if l == "A0" or l == "No results")
-    input_length = len(text)
+# Bump when the report computed from word-level assignments changes, so
+# cached results (see result_cache) are not reused
+SCORING_VERSION = 1
 
-    # All possible levels
-    all_levels = ["A0", "A1", "A2", "B1", "B2", "C1", "C2"]
+
+def grade_with_probabilities(
+    text: str, profile: bool = False, cache: Optional["ResultCache"] = None
+) -> tuple[dict, dict]:
+    """
+    Grade a text. With profile=True, the result gets a "timings" section
+    with the time spent in each stage, spaCy invocations, n-gram probes
+    and cache hits. With a ResultCache, texts graded before are not
+    graded again (profiled runs always are).
+    """
+    if not profile:
+        if cache is not None:
+            cached = cache.get(text)
+            if cached is not None:
+                return cached
+        # Get word-level CEFR assignments
+        word_levels = detect_word_levels(text=text)
+        graded = grade_word_levels(word_levels=word_levels, input_length=len(text))
+        if cache is not None:
+            cache.put(text, graded)
+        return graded
+
+    profiler = Profile()
+    with profiler.stage("load"):
+        get_vocabulary_trie()
+    word_levels = detect_word_levels(text=text, profile=profiler)
+    with profiler.stage("score"):
+        result, word_level_dict = grade_word_levels(
+            word_levels=word_levels, input_length=len(text)
+        )
+    result["timings"] = profiler.report()
+    return result, word_level_dict
+
+
+def grade_many(
+    texts: Iterable[str],
+    batch_size: int = 64,
+    n_process: int = 1,
+    cache: Optional["ResultCache"] = None,
+) -> Iterator[tuple[dict, dict]]:
+    """
+    Grade many texts, yielding (result, word_level_dict) pairs in input order.
+    Texts are consumed lazily in batches of `batch_size`; the distinct words
+    of each batch go through nlp.pipe together. With n_process > 1, batches
+    are graded in a pool of worker processes. With a ResultCache, only the
+    texts not found in it are graded.
+    """
+    for _, results in grade_batches(_batched(texts, batch_size), n_process=n_process, cache=cache):
+        yield from results
+
+
+def grade_batches(
+    batches: Iterable[list[str]],
+    n_process: int = 1,
+    cache: Optional["ResultCache"] = None,
+    ordered: bool = True,
+) -> Iterator[tuple[int, list[tuple[dict, dict]]]]:
+    """
+    Grade batches of texts, yielding (batch index, results) pairs. Batches
+    are yielded in input order, or with ordered=False and n_process > 1,
+    as soon as a worker finishes them.
+    """
+    if n_process <= 1:
+        for index, batch in enumerate(batches):
+            if cache is None:
+                yield index, _grade_batch(batch)
+            else:
+                cached = cache.get_many(batch)
+                misses = [text for text, hit in zip(batch, cached) if hit is None]
+                yield index, _merge_cached(batch, cached, _grade_batch(misses), cache)
+        return
+
+    # Load the model and vocabulary before forking so workers share them,
+    # frozen so the workers' garbage collector does not copy their pages.
+    # If the caller froze them already (warmup(freeze=True)), nothing more
+    # is frozen: objects frozen here for good could never be collected.
+    get_nlp()
+    get_expression_trie()
+    get_lemma_table()
+    if gc.get_freeze_count() == 0:
+        gc.freeze()
+        try:
+            pool = multiprocessing.Pool(processes=n_process)
+        finally:
+            gc.unfreeze()
+    else:
+        pool = multiprocessing.Pool(processes=n_process)
+    with pool:
+        # Keep a bounded number of batches in flight so the input is read lazily
+        pending: dict = {}
+        done: queue.Queue = queue.Queue()
+
+        def finish() -> tuple[int, list[tuple[dict, dict]]]:
+            # The oldest batch, or with ordered=False the first one finished
+            index = next(iter(pending)) if ordered else done.get()
+            batch, cached, graded = pending.pop(index)
+            return index, _merge_cached(batch, cached, graded.get(), cache)
+
+        for index, batch in enumerate(batches):
+            # Cache lookups and stores happen here; workers only grade misses
+            cached = cache.get_many(batch) if cache is not None else [None] * len(batch)
+            misses = [text for text, hit in zip(batch, cached) if hit is None]
+            notify = partial(_notify, done, index)
+            graded = pool.apply_async(
+                _grade_batch, (misses,), callback=notify, error_callback=notify
+            )
+            pending[index] = (batch, cached, graded)
+            if len(pending) >= 2 * n_process:
+                yield finish()
+        while pending:
+            yield finish()
+
+
+def _notify(done: queue.Queue, index: int, _) -> None:
+    done.put(index)
+
+
+def _batched(texts: Iterable[str], size: int) -> Iterator[list[str]]:
+    iterator = iter(texts)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _merge_cached(
+    batch: list[str],
+    cached: list[Optional[tuple[dict, dict]]],
+    graded: list[tuple[dict, dict]],
+    cache: Optional["ResultCache"],
+) -> list[tuple[dict, dict]]:
+    # Put the newly graded results in the gaps between cache hits, storing them
+    if cache is not None:
+        cache.put_many([text for text, hit in zip(batch, cached) if hit is None], graded)
+    fresh = iter(graded)
+    return [hit if hit is not None else next(fresh) for hit in cached]
+
+
+def _grade_batch(texts: list[str]) -> list[tuple[dict, dict]]:
+    # Lemmatize all words of the batch in one pass, then match and grade each text
+    words_per_text = [extract_words(text=text) for text in texts]
+    all_words = [w for words in words_per_text for w in words]
+    lemmas = lemmatize_words(all_words)
+
+    results = []
+    offset = 0
+    for text, words in zip(texts, words_per_text):
+        text_lemmas = lemmas[offset:offset + len(words)]
+        offset += len(words)
+        word_levels = match_word_levels(words=words, lemmas=text_lemmas)
+        results.append(grade_word_levels(word_levels=word_levels, input_length=len(text)))
+    return results
+
+
+def grade_word_levels(
+    word_levels: list[tuple[str, str]], input_length: int
+) -> tuple[dict, dict]:
+    """Compute the grading report from word-level CEFR assignments."""
+    accumulator = GradeAccumulator()
+    accumulator.add(word_levels=word_levels, input_length=input_length)
+    # Word-level output dict
+    word_level_dict = {w: l for w, l in word_levels}
+    return accumulator.result(), word_level_dict
+
+
+# All possible levels
+ALL_LEVELS = ["A0", "A1", "A2", "B1", "B2", "C1", "C2"]
+
+
+class GradeAccumulator:
+    """
+    Collects word-level CEFR assignments incrementally, e.g. chunk by chunk,
+    and computes the same report as grade_with_probabilities over all of them.
+    Accumulators of different shards can be merged (in any grouping) and
+    serialized with to_dict() for map-reduce over a corpus.
+    """
+
+    def __init__(self) -> None:
+        self.freq: Counter = Counter()
+        self.total_words = 0
+        self.unknown_words = 0
+        self.input_length = 0
+        self.unique_words: set[str] = set()
+        # Level -> expressions found at that level, in first-seen order
+        self.found_expressions: dict[str, dict[str, None]] = {}
+
+    def add(self, word_levels: list[tuple[str, str]], input_length: int = 0) -> None:
+        """Add word-level assignments and the length of the text they came from."""
+        self.input_length += input_length
+        for word, level in word_levels:
+            self.total_words += 1
+            self.unique_words.add(word)
+            if level == "A0" or level == "No results":
+                self.unknown_words += 1
+            self.freq[level if level in ALL_LEVELS else "A0"] += 1
+            # Group found expressions by level (excluding unknown/No results)
+            if level not in ["A0", "No results"]:
+                self.found_expressions.setdefault(level, {})[word] = None
+
+    def merge(self, other: "GradeAccumulator") -> "GradeAccumulator":
+        """Add everything collected by `other` to this accumulator and return it."""
+        self.freq.update(other.freq)
+        self.total_words += other.total_words
+        self.unknown_words += other.unknown_words
+        self.input_length += other.input_length
+        self.unique_words.update(other.unique_words)
+        for level, words in other.found_expressions.items():
+            self.found_expressions.setdefault(level, {}).update(words)
+        return self
+
+    def to_dict(self) -> dict:
+        """JSON-serializable state, for from_dict()."""
+        # Found expressions are unique words too, so they are only stored once
+        found = {word for words in self.found_expressions.values() for word in words}
+        return {
+            "freq": dict(self.freq),
+            "total_words": self.total_words,
+            "unknown_words": self.unknown_words,
+            "input_length": self.input_length,
+            "other_words": sorted(self.unique_words - found),
+            "found_expressions": {
+                level: list(words) for level, words in self.found_expressions.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GradeAccumulator":
+        """Rebuild an accumulator from to_dict() output."""
+        accumulator = cls()
+        accumulator.freq = Counter(data["freq"])
+        accumulator.total_words = data["total_words"]
+        accumulator.unknown_words = data["unknown_words"]
+        accumulator.input_length = data["input_length"]
+        accumulator.found_expressions = {
+            level: dict.fromkeys(words) for level, words in data["found_expressions"].items()
+        }
+        accumulator.unique_words = set(data["other_words"])
+        for words in data["found_expressions"].values():
+            accumulator.unique_words.update(words)
+        return accumulator
+
+    def result(self) -> dict:
+        """Compute the grading report for everything added so far."""
+        # Sort expressions within each level
+        found_expressions = {
+            level: sorted(words) for level, words in self.found_expressions.items()
+        }
+        return _build_report(
+            freq=self.freq,
+            total_words=self.total_words,
+            unique_words=len(self.unique_words),
+            unknown_words=self.unknown_words,
+            input_length=self.input_length,
+            found_expressions=found_expressions,
+        )
+
+
+def _build_report(
+    freq: Counter,
+    total_words: int,
+    unique_words: int,
+    unknown_words: int,
+    input_length: int,
+    found_expressions: dict[str, list[str]],
+) -> dict:
+    # Compute grade, predicted level, confidence and probabilities from level counts
+    all_levels = ALL_LEVELS
     level_values = {"A0": 0, "A1": 1, "A2": 2, "B1": 3, "B2": 4, "C1": 5, "C2": 6}
-    levels = [l if l in all_levels else "A0" for l in levels]
-    freq = Counter(levels)
     
     # Separate known and unknown words
     known_levels = ["A1", "A2", "B1", "B2", "C1", "C2"]
@@ -82,22 +352,6 @@ def grade_with_probabilities(text: str) -> tuple[dict, dict]:
         else:
             # Should not reach here, but fallback
             grade = 0.0
-    # Word-level output dict
-    word_level_dict = {w: l for w, l in word_levels}
-    
-    # Group found expressions by level (excluding unknown/No results)
-    found_expressions = {}
-    for word, level in word_levels:
-        if level not in ["A0", "No results"]:
-            if level not in found_expressions:
-                found_expressions[level] = []
-            if word not in found_expressions[level]:  # Avoid duplicates
-                found_expressions[level].append(word)
-    
-    # Sort expressions within each level
-    for level in found_expressions:
-        found_expressions[level].sort()
-    
     # Convert grade (0-1) to CEFR level prediction
     # Map grade to CEFR levels: 0=A0, 0-1/6=A1, 1/6-2/6=A2, 2/6-3/6=B1, 3/6-4/6=B2, 4/6-5/6=C1, 5/6-1.0=C2
     if grade == 0.0:
@@ -167,4 +421,4 @@ def grade_with_probabilities(text: str) -> tuple[dict, dict]:
         },
         "found_expressions": found_expressions,
     }
-    return result, word_level_dict
+    return result
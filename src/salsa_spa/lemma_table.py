@@ -0,0 +1,175 @@
+"""
+Precomputed surface form -> lemma lookup for the lemmatization hot path.
+The table holds the lemma of every word in the vocabulary CSV, plus the
+words of any local corpus added with build_corpus_lemmas(). Entries are
+computed exactly like lemmatize_tokens, so looking a word up instead of
+running spaCy never changes a grade; only unseen forms go to spaCy.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from typing import Iterable, Optional
+from .file_io import get_cache_dir, iter_text_chunks, write_file_atomic
+from .profiling import current_profile
+from .text_cleaning import DEFAULT_EXCLUDE, extract_words, get_pipeline, lemmatize_tokens
+from .vocab_index import package_version
+from .vocab_lists import get_form_lemmas
+
+logger = logging.getLogger(__name__)
+
+# Bump when lemmatize_tokens output changes, so stale corpus lemmas are not used
+CORPUS_LEMMAS_VERSION = 2
+
+
+class LemmaTable:
+    """
+    Form -> lemma table with a spaCy fallback for unseen forms.
+    Counts how many words were served by the table (hits) and how many
+    needed the fallback (misses).
+    """
+
+    def __init__(self, lemmas: dict[str, str]) -> None:
+        self.lemmas = lemmas
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def lemmatize(self, words: list[str]) -> list[str]:
+        """Return one lemma per word, like lemmatize_tokens."""
+        lemmas = self.lemmas
+        unseen = [w for w in dict.fromkeys(words) if w not in lemmas]
+        fallback = dict(zip(unseen, lemmatize_tokens(unseen))) if unseen else {}
+
+        result = []
+        misses = 0
+        for word in words:
+            lemma = lemmas.get(word)
+            if lemma is None:
+                lemma = fallback[word]
+                misses += 1
+            result.append(lemma)
+
+        with self._lock:
+            self.hits += len(words) - misses
+            self.misses += misses
+        profile = current_profile()
+        if profile is not None:
+            profile.count("lemma_table_hits", len(words) - misses)
+            profile.count("lemma_table_misses", misses)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.lemmas),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+_table: Optional[LemmaTable] = None
+_table_lock = threading.Lock()
+
+
+def corpus_lemmas_path() -> str:
+    # Corpus lemmas depend on the model, so each model version and set of
+    # excluded components gets its own file
+    model_name, exclude = get_pipeline()
+    name = f"corpus-lemmas-v{CORPUS_LEMMAS_VERSION}-{model_name}-{package_version(model_name)}"
+    if sorted(exclude) != sorted(DEFAULT_EXCLUDE):
+        name += "-" + hashlib.sha256(",".join(sorted(exclude)).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(get_cache_dir(), name + ".tsv")
+
+
+def _load_corpus_lemmas() -> dict[str, str]:
+    path = corpus_lemmas_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return dict(line.rstrip("\n").split("\t", 1) for line in f if line.strip())
+    except Exception as e:
+        logger.warning(f"Error loading corpus lemmas: {e}")
+        return {}
+
+
+def clear_lemma_table() -> None:
+    """Drop the loaded lemma table, e.g. after changing the spaCy model."""
+    global _table
+    with _table_lock:
+        _table = None
+
+
+def get_lemma_table() -> LemmaTable:
+    """Return the lemma table, loading it on first use."""
+    global _table
+    table = _table
+    if table is not None:
+        return table
+    with _table_lock:
+        if _table is None:
+            lemmas = _load_corpus_lemmas()
+            if lemmas:
+                lemmas.update(get_form_lemmas())
+            else:
+                # Without corpus lemmas, share the vocabulary's dict instead of copying it
+                lemmas = get_form_lemmas()
+            _table = LemmaTable(lemmas)
+        return _table
+
+
+def lemmatize_words(words: list[str]) -> list[str]:
+    """
+    Lemmatize a pre-tokenized word sequence, looking each form up in the
+    lemma table first and running spaCy only for unseen forms.
+    """
+    if not words:
+        return []
+    return get_lemma_table().lemmatize(words)
+
+
+def lemma_table_stats() -> dict:
+    """Return how often the lemma table was used instead of spaCy."""
+    return get_lemma_table().stats()
+
+
+def build_corpus_lemmas(paths: Iterable[str], batch_size: int = 10000) -> int:
+    """
+    Add the forms found in local text files to the corpus lemma table in the
+    cache directory. Returns the number of new forms.
+    """
+    table = get_lemma_table()
+    if table.lemmas is get_form_lemmas():
+        table.lemmas = dict(table.lemmas)
+    corpus_lemmas = _load_corpus_lemmas()
+    pending: dict[str, None] = {}
+    new_forms = 0
+
+    def flush() -> None:
+        nonlocal new_forms
+        words = list(pending)
+        pending.clear()
+        for word, lemma in zip(words, lemmatize_tokens(words)):
+            corpus_lemmas[word] = lemma
+            table.lemmas[word] = lemma
+        new_forms += len(words)
+
+    for path in paths:
+        chunks = iter_text_chunks(filepath=path)
+        if chunks is None:
+            continue
+        for chunk in chunks:
+            for word in extract_words(text=chunk):
+                if word not in table.lemmas:
+                    pending[word] = None
+            if len(pending) >= batch_size:
+                flush()
+    flush()
+
+    lines = "".join(f"{form}\t{lemma}\n" for form, lemma in sorted(corpus_lemmas.items()))
+    write_file_atomic(corpus_lemmas_path(), [lines.encode("utf-8")])
+    return new_forms
@@ -0,0 +1,54 @@
+"""
+Opt-in per-stage profiling for the grading pipeline.
+A Profile records the wall time of each pipeline stage and counters such as
+spaCy invocations, n-gram probes and cache hits. Code deep in the pipeline
+finds the profile of the stage it runs in through current_profile(), which
+is None unless profiling was requested, so the cost when off is one lookup
+per call rather than per word.
+"""
+
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Iterator, Optional
+
+_active_profile: ContextVar[Optional["Profile"]] = ContextVar("salsa_profile", default=None)
+
+
+class Profile:
+    """Stage timings and counters of one grading run. Stages may repeat and add up."""
+
+    def __init__(self) -> None:
+        self.stages: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed code as stage `name` and make this the current profile."""
+        token = _active_profile.set(self)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+            _active_profile.reset(token)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self) -> dict:
+        return {
+            "stages": dict(self.stages),
+            "total_time": sum(self.stages.values()),
+            **self.counters,
+        }
+
+
+def current_profile() -> Optional[Profile]:
+    """Return the profile of the stage being run, or None when not profiling."""
+    return _active_profile.get()
+
+
+def profile_stage(profile: Optional[Profile], name: str) -> ContextManager:
+    # Time a stage when profiling, do nothing otherwise
+    return profile.stage(name) if profile is not None else nullcontext()
@@ -0,0 +1,202 @@
+"""
+Persistent cache of grading results, in an SQLite database in the cache
+directory. Grades only depend on the words of a text, so entries are keyed
+by a hash of its normalized word sequence together with everything else
+the result depends on: the vocabulary CSV, the spaCy model and its excluded
+components, the library version and the scoring version. Several processes
+can share the database; it is opened in WAL mode and waits for locks held
+by other writers. The least recently used entries are evicted beyond
+max_entries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from .file_io import get_cache_dir
+from .grader_prob import SCORING_VERSION
+from .text_cleaning import extract_words, get_pipeline
+from .vocab_index import index_key
+from .vocab_lists import VOCAB_CSV_PATH
+
+logger = logging.getLogger(__name__)
+
+# Default capacity of the result cache, in entries
+RESULT_CACHE_SIZE = int(os.environ.get("SALSA_RESULT_CACHE_SIZE", "100000"))
+
+# Eviction runs once every this many stores rather than on every one
+_EVICT_EVERY = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+
+def result_cache_path() -> str:
+    return os.path.join(get_cache_dir(), "results.sqlite")
+
+
+class ResultCache:
+    """
+    On-disk (result, word_level_dict) cache for grade_with_probabilities
+    and grade_many. Safe to share between threads; each process opens its
+    own connection.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None) -> None:
+        self.path = path or result_cache_path()
+        self.max_entries = RESULT_CACHE_SIZE if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._salts: dict[tuple, bytes] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection must not be used across fork, so each process opens its
+        # own. Raises sqlite3.Error or OSError (e.g. an unwritable directory),
+        # which callers treat as the cache being unavailable.
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _salt(self) -> bytes:
+        # Everything besides the words that the result depends on
+        pipeline = get_pipeline()
+        salt = self._salts.get(pipeline)
+        if salt is None:
+            key = index_key(VOCAB_CSV_PATH, *pipeline)
+            salt = f"{key}\0{SCORING_VERSION}\0".encode("utf-8")
+            self._salts[pipeline] = salt
+        return salt
+
+    def key(self, text: str) -> str:
+        """Cache key of a text: texts with the same words share it."""
+        digest = hashlib.sha256(self._salt())
+        digest.update("\0".join(extract_words(text=text)).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, texts: list[str]) -> list[Optional[tuple[dict, dict]]]:
+        """Return the cached (result, word_level_dict) of each text, or None."""
+        keys = [self.key(text) for text in texts]
+        found: dict[str, str] = {}
+        with self._lock:
+            try:
+                connection = self._connect()
+                distinct = list(dict.fromkeys(keys))
+                for i in range(0, len(distinct), 500):
+                    chunk = distinct[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    found.update(connection.execute(
+                        f"SELECT key, value FROM results WHERE key IN ({placeholders})", chunk
+                    ))
+                if found:
+                    connection.executemany(
+                        "UPDATE results SET accessed = ? WHERE key = ?",
+                        [(time.time(), key) for key in found],
+                    )
+                    connection.commit()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"Result cache unavailable: {e}")
+
+        results: list[Optional[tuple[dict, dict]]] = []
+        for text, key in zip(texts, keys):
+            value = found.get(key)
+            if value is None:
+                results.append(None)
+                continue
+            result, word_level_dict = json.loads(value)
+            # Texts with the same words can differ in length
+            result["stats"]["input_length"] = len(text)
+            results.append((result, word_level_dict))
+        hits = sum(r is not None for r in results)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(texts) - hits
+        return results
+
+    def get(self, text: str) -> Optional[tuple[dict, dict]]:
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: list[str], results: list[tuple[dict, dict]]) -> None:
+        """Store the (result, word_level_dict) of each text."""
+        now = time.time()
+        rows = [
+            (self.key(text), json.dumps(result, ensure_ascii=False), now)
+            for text, result in zip(texts, results)
+        ]
+        if not rows:
+            return
+        with self._lock:
+            try:
+                connection = self._connect()
+                connection.executemany(
+                    "INSERT OR REPLACE INTO results (key, value, accessed) VALUES (?, ?, ?)", rows
+                )
+                self._stores += len(rows)
+                if self._stores >= _EVICT_EVERY:
+                    self._stores = 0
+                    self._evict(connection)
+                connection.commit()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"Could not store results in the cache: {e}")
+
+    def put(self, text: str, result: tuple[dict, dict]) -> None:
+        self.put_many([text], [result])
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        # Drop the least recently used entries beyond max_entries
+        (count,) = connection.execute("SELECT COUNT(*) FROM results").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                connection = self._connect()
+                connection.execute("DELETE FROM results")
+                connection.commit()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"Could not clear the result cache: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            try:
+                (entries,) = self._connect().execute("SELECT COUNT(*) FROM results").fetchone()
+            except (sqlite3.Error, OSError):
+                entries = 0
+            total = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "path": self.path,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
@@ -0,0 +1,82 @@
+"""
+Vectorized CEFR scoring for batches of documents.
+score_level_counts computes grade, predicted level, confidence and
+probabilities for every row of a documents x levels count matrix at once,
+with the same formulas as the per-document report in grader_prob.
+"""
+
+from collections import Counter
+from typing import Iterable
+import numpy as np
+from .grader_prob import ALL_LEVELS
+
+# Level values of the known levels A1..C2 (columns 1..6 of a count matrix)
+_LEVEL_VALUES = np.arange(1, len(ALL_LEVELS), dtype=np.float64)
+_POLY_WEIGHTS = _LEVEL_VALUES ** 1.02
+# Upper grade bound of A1..B2..C1; anything above the last one is C2
+_GRADE_THRESHOLDS = np.array([1 / 6, 2 / 6, 3 / 6, 4 / 6, 5 / 6])
+
+
+def count_matrix(freqs: Iterable[Counter]) -> np.ndarray:
+    """
+    Stack per-document level counts (e.g. GradeAccumulator.freq) into a
+    documents x ALL_LEVELS matrix.
+    """
+    return np.array(
+        [[freq.get(level, 0) for level in ALL_LEVELS] for freq in freqs],
+        dtype=np.float64,
+    ).reshape(-1, len(ALL_LEVELS))
+
+
+def score_level_counts(counts: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Score a documents x ALL_LEVELS matrix of word counts.
+    Returns arrays with one entry per document: "grade", "predicted_level",
+    "confidence" and "probabilities" (documents x ALL_LEVELS). Values match
+    grade_with_probabilities to floating-point tolerance.
+    """
+    counts = np.asarray(counts, dtype=np.float64).reshape(-1, len(ALL_LEVELS))
+    total_words = counts.sum(axis=1)
+    known = counts[:, 1:]
+    known_words = known.sum(axis=1)
+    has_known = known_words > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        probabilities = np.where(
+            total_words[:, None] > 0, counts / total_words[:, None], 0.0
+        )
+        probabilities_known = np.where(has_known[:, None], known / known_words[:, None], 0.0)
+
+        # Weighted average level value, normalized to 0-1 and capped at 1
+        weighted = probabilities_known * _POLY_WEIGHTS
+        numerator = (weighted * _LEVEL_VALUES).sum(axis=1)
+        denominator = weighted.sum(axis=1)
+        grade = np.where(
+            denominator > 0, np.minimum(numerator / denominator / 6.0, 1.0), 0.0
+        )
+
+        # Confidence: known ratio, concentration of the distribution, sample size
+        present = probabilities_known > 0
+        n_present = present.sum(axis=1)
+        entropy = -np.where(
+            present, probabilities_known * np.log(probabilities_known + 1e-10), 0.0
+        ).sum(axis=1)
+        max_entropy = np.where(n_present > 1, np.log(np.maximum(n_present, 1)), 1.0)
+        concentration = np.where(n_present > 0, 1.0 - entropy / max_entropy, 0.0)
+        known_ratio = np.where(total_words > 0, known_words / total_words, 0.0)
+    sample_factor = np.minimum(np.log(known_words + 1) / np.log(51), 1.0)
+    confidence = np.clip(
+        0.4 * known_ratio + 0.4 * concentration + 0.2 * sample_factor, 0.0, 1.0
+    )
+    confidence = np.where(has_known, confidence, 0.0)
+
+    # A0 for a zero grade, otherwise the first level whose upper bound is not exceeded
+    level_index = np.where(
+        grade == 0.0, 0, 1 + (grade[:, None] > _GRADE_THRESHOLDS).sum(axis=1)
+    )
+    return {
+        "grade": grade,
+        "predicted_level": np.array(ALL_LEVELS)[level_index],
+        "confidence": confidence,
+        "probabilities": probabilities,
+    }
@@ -0,0 +1,123 @@
+"""
+Grading of paragraphs or sliding windows of a long document in one pass.
+The document is lemmatized and matched once; every matched expression is
+counted at the word where it starts, prefix sums of those counts give the
+level counts of any word span, and all segments are scored together with
+scoring.score_level_counts.
+"""
+
+import re
+from typing import Optional
+import numpy as np
+from .grader_prob import ALL_LEVELS, grade_word_levels
+from .lemma_table import lemmatize_words
+from .scoring import score_level_counts
+from .text_cleaning import extract_words
+from .word_level import match_word_levels
+
+# Paragraphs are separated by blank lines
+_PARAGRAPH_BREAK = re.compile(r"\n[^\S\n]*\n\s*")
+
+
+def split_paragraphs(text: str) -> list[tuple[int, int]]:
+    """Return the (start, end) character spans of the paragraphs of text."""
+    spans = []
+    start = 0
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        if text[start:match.start()].strip():
+            spans.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+
+def _window_spans(n_words: int, window: int, step: int) -> list[tuple[int, int]]:
+    # Windows of `window` words every `step` words; the last one ends at the last word
+    spans = []
+    start = 0
+    while start < n_words:
+        end = min(start + window, n_words)
+        spans.append((start, end))
+        if end == n_words:
+            break
+        start += step
+    return spans
+
+
+def level_count_prefix_sums(word_levels: list[tuple[str, str]], n_words: int) -> np.ndarray:
+    """
+    (n_words + 1) x ALL_LEVELS matrix whose row i holds the level counts of
+    the expressions starting before word i, so rows b - a are the counts of
+    the word span [a, b).
+    """
+    column = {level: i for i, level in enumerate(ALL_LEVELS)}
+    starts = np.empty(len(word_levels), dtype=np.int64)
+    columns = np.empty(len(word_levels), dtype=np.int64)
+    position = 0
+    for i, (expression, level) in enumerate(word_levels):
+        starts[i] = position
+        columns[i] = column.get(level, 0)  # "No results" counts as A0
+        position += expression.count(" ") + 1
+    increments = np.zeros((n_words + 1, len(ALL_LEVELS)), dtype=np.float64)
+    np.add.at(increments, (starts + 1, columns), 1.0)
+    return np.cumsum(increments, axis=0)
+
+
+def grade_segments(
+    text: str, window: Optional[int] = None, step: Optional[int] = None
+) -> tuple[dict, list[dict]]:
+    """
+    Grade a document and each of its segments. Segments are paragraphs by
+    default, or windows of `window` words every `step` words (default: no
+    overlap). Returns the document result, as from grade_with_probabilities,
+    and one dict per segment with its word span ("start_word", "end_word"),
+    "total_words", "grade", "predicted_level" and "confidence"; paragraphs
+    also have their character span ("start_char", "end_char").
+    An expression belongs to the segment it starts in.
+    """
+    if window is not None and window < 1:
+        raise ValueError("window must be at least 1 word")
+    if step is not None and step < 1:
+        raise ValueError("step must be at least 1 word")
+
+    paragraphs = split_paragraphs(text) if window is None else []
+    if window is None:
+        # Words never span a blank line, so these are the words of the text
+        words_per_paragraph = [extract_words(text=text[a:b]) for a, b in paragraphs]
+        words = [w for paragraph_words in words_per_paragraph for w in paragraph_words]
+    else:
+        words = extract_words(text=text)
+    word_levels = match_word_levels(words=words, lemmas=lemmatize_words(words)) if words else []
+    result, _ = grade_word_levels(word_levels=word_levels, input_length=len(text))
+
+    if window is None:
+        spans = []
+        offset = 0
+        for paragraph_words in words_per_paragraph:
+            spans.append((offset, offset + len(paragraph_words)))
+            offset += len(paragraph_words)
+    else:
+        spans = _window_spans(len(words), window, step or window)
+    if not spans:
+        return result, []
+
+    prefix = level_count_prefix_sums(word_levels, len(words))
+    bounds = np.array(spans, dtype=np.int64)
+    counts = prefix[bounds[:, 1]] - prefix[bounds[:, 0]]
+    scores = score_level_counts(counts)
+
+    segments = []
+    for i, (start, end) in enumerate(spans):
+        segment = {
+            "start_word": start,
+            "end_word": end,
+            "total_words": int(counts[i].sum()),
+            "grade": float(scores["grade"][i]),
+            "predicted_level": str(scores["predicted_level"][i]),
+            "confidence": float(scores["confidence"][i]),
+        }
+        if paragraphs:
+            segment["start_char"], segment["end_char"] = paragraphs[i]
+        segments.append(segment)
+    return result, segments
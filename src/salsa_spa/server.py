@@ -0,0 +1,192 @@
+"""
+HTTP grading service for salsa-spa.
+Keeps the spaCy model and the vocabulary loaded and grades texts posted to
+it. Requests that arrive together are gathered into micro-batches so their
+words go through the lemmatizer in one pass.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from .grader_prob import grade_many
+from . import warmup
+
+logger = logging.getLogger(__name__)
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+
+class MicroBatcher:
+    """
+    Grades submitted texts in batches on a background thread.
+    A batch is sent as soon as it holds `max_batch_size` texts, or when
+    `max_wait` seconds have passed since its first text arrived.
+    """
+
+    def __init__(self, max_batch_size: int = 32, max_wait: float = 0.005) -> None:
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="salsa-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text and return a future for its (result, word_level_dict)."""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def close(self) -> None:
+        """Grade what is already queued, then stop the background thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self) -> tuple[list[tuple[str, Future]], bool]:
+        # Block for the first item, then gather more until the batch is full
+        # or the wait is over. Returns (batch, closed).
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        closed = False
+        while not closed:
+            batch, closed = self._next_batch()
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            try:
+                results = list(grade_many(texts, batch_size=len(texts)))
+            except Exception as e:
+                logger.exception("Error grading batch")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class GradingRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /grade with a JSON body {"text": "..."} returns the grading report.
+    GET /health returns {"status": "ok"}.
+    """
+
+    server: "GradingServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self) -> None:
+        if self.path != "/grade":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        # Without a valid length the end of the body is unknown, so the
+        # connection cannot be reused
+        try:
+            length = int(self.headers["Content-Length"])
+            if length < 0:
+                raise ValueError(length)
+        except (TypeError, ValueError):
+            self._send_json(400, {"error": "Missing or invalid Content-Length"})
+            self.close_connection = True
+            return
+        if length > MAX_BODY_SIZE:
+            self._send_json(413, {"error": "Request body too large"})
+            self.close_connection = True
+            return
+        try:
+            body = json.loads(self.rfile.read(length))
+            text = body["text"]
+            if not isinstance(text, str):
+                raise TypeError("text must be a string")
+        except Exception as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+
+        try:
+            result, _ = self.server.batcher.submit(text).result()
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, result)
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class GradingServer(ThreadingHTTPServer):
+    """Threaded HTTP server that hands texts to a shared MicroBatcher."""
+
+    daemon_threads = True
+    # Allow a deep backlog of pending connections under bursts of requests
+    request_queue_size = 1024
+
+    def __init__(self, address: tuple[str, int], batcher: MicroBatcher) -> None:
+        super().__init__(address, GradingRequestHandler)
+        self.batcher = batcher
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_batch_size: int = 32,
+    max_wait: float = 0.005,
+    batcher: Optional[MicroBatcher] = None,
+) -> GradingServer:
+    """Load the model and vocabulary and create a server ready to serve_forever()."""
+    warmup()
+    if batcher is None:
+        batcher = MicroBatcher(max_batch_size=max_batch_size, max_wait=max_wait)
+    return GradingServer((host, port), batcher)
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_batch_size: int = 32,
+    max_wait: float = 0.005,
+) -> None:
+    """Run the grading service until interrupted."""
+    server = make_server(host=host, port=port, max_batch_size=max_batch_size, max_wait=max_wait)
+    logger.info(f"Serving on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
@@ -0,0 +1,278 @@
+"""
+Incremental grading of a document that is edited over time.
+A DocumentSession keeps the words, lemma IDs and matches of every sentence
+of the current text. When the text is updated, only the sentences that
+changed are lemmatized, matching restarts at the first expression that
+could reach into the edit, and stops as soon as it lines up with the
+previous matches again after it. The report is recomputed from running
+counts, so the work per update depends on the size of the edit.
+"""
+
+import re
+from collections import Counter
+from typing import Optional
+from .expression_trie import ExpressionTrie
+from .grader_prob import ALL_LEVELS, _build_report
+from .lemma_table import lemmatize_words
+from .text_cleaning import extract_words
+from .word_level import _longest_match, get_expression_trie
+
+# Sentences end after terminal punctuation followed by whitespace, or at a
+# line break. Words never span such a boundary, so the words of a text are
+# the words of its sentences in order.
+_SENTENCE_END = re.compile(r"[.!?…]+\s+|\n\s*")
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split text into sentences; joining them gives back the text."""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+
+class _Sentence:
+    """
+    One sentence of the document. `matches` holds (start, end, level,
+    expression, read_end) for the expressions that start in this sentence,
+    with word offsets relative to its first word; `end` and `read_end` (the
+    end of the words the matcher looked at) may lie in later sentences.
+    """
+
+    __slots__ = ("text", "words", "ids", "matches")
+
+    def __init__(self, text: str, words: list[str], ids: list[int]) -> None:
+        self.text = text
+        self.words = words
+        self.ids = ids
+        self.matches: list[tuple[int, int, Optional[str], str, int]] = []
+
+    def reach(self) -> int:
+        # Number of words past the end of this sentence that matching read
+        if not self.matches:
+            return 0
+        return max(match[4] for match in self.matches) - len(self.words)
+
+
+class DocumentSession:
+    """
+    Grades a document incrementally. update() with the full new text
+    returns the same report as grade_with_probabilities on that text.
+    """
+
+    def __init__(self, text: str = "") -> None:
+        self._trie: Optional[ExpressionTrie] = None
+        self._sentences: list[_Sentence] = []
+        self._input_length = 0
+        # Running counts over all matches of the document
+        self._levels: Counter = Counter()
+        self._expressions: Counter = Counter()
+        self._found: Counter = Counter()
+        # Work done by the last update, for monitoring
+        self.last_update = {"sentences": 0, "lemmatized": 0, "rescanned": 0}
+        if text:
+            self.update(text)
+
+    def update(self, text: str) -> dict:
+        """Replace the document text and return the updated report."""
+        trie = get_expression_trie()
+        if trie is not self._trie:
+            # The vocabulary changed: nothing cached is valid
+            self._sentences = []
+            self._levels.clear()
+            self._expressions.clear()
+            self._found.clear()
+            self._trie = trie
+
+        texts = split_sentences(text)
+        old = self._sentences
+        self._input_length = len(text)
+
+        # Unchanged sentences at the start and at the end
+        limit = min(len(old), len(texts))
+        prefix = 0
+        while prefix < limit and old[prefix].text == texts[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix].text == texts[-1 - suffix]:
+            suffix += 1
+
+        if prefix == len(old) == len(texts):
+            self.last_update = {"sentences": len(old), "lemmatized": 0, "rescanned": 0}
+            return self.result()
+
+        # Earlier sentences whose matching read into the edit are rescanned too
+        start = prefix
+        distance = 0
+        i = prefix - 1
+        while i >= 0 and distance < trie.max_length:
+            if old[i].reach() > distance:
+                start = i
+            distance += len(old[i].words)
+            i -= 1
+
+        # Sentences in the edited span: reuse unchanged ones, lemmatize the rest
+        reusable = {s.text: s for s in old[prefix:len(old) - suffix]}
+        middle = old[start:prefix]
+        fresh = []
+        for sentence_text in texts[prefix:len(texts) - suffix]:
+            previous = reusable.get(sentence_text)
+            if previous is not None:
+                sentence = _Sentence(sentence_text, previous.words, previous.ids)
+            else:
+                sentence = _Sentence(sentence_text, extract_words(text=sentence_text), [])
+                fresh.append(sentence)
+            middle.append(sentence)
+        fresh_words = [w for sentence in fresh for w in sentence.words]
+        fresh_ids = trie.encode(lemmatize_words(fresh_words))
+        offset = 0
+        for sentence in fresh:
+            sentence.ids = fresh_ids[offset:offset + len(sentence.words)]
+            offset += len(sentence.words)
+
+        tail = old[len(old) - suffix:]
+        rescanned = self._rescan(trie, old[:start], middle, tail, old[start:len(old) - suffix])
+        self._sentences = old[:start] + middle + tail
+        self.last_update = {
+            "sentences": len(self._sentences),
+            "lemmatized": len(fresh),
+            "rescanned": rescanned,
+        }
+        return self.result()
+
+    def _rescan(
+        self,
+        trie: ExpressionTrie,
+        head: list[_Sentence],
+        middle: list[_Sentence],
+        tail: list[_Sentence],
+        replaced: list[_Sentence],
+    ) -> int:
+        # Match `middle`, then `tail` until the matches line up with the old
+        # ones again. Updates the sentences' matches and the running counts,
+        # and returns the number of sentences rescanned.
+        for sentence in replaced:
+            self._count(sentence.matches, -1)
+
+        # Words at the start of `middle` covered by a match from `head`
+        skip = 0
+        distance = 0
+        for sentence in reversed(head):
+            if distance >= trie.max_length:
+                break
+            if sentence.matches:
+                skip = max(skip, sentence.matches[-1][1] - len(sentence.words) - distance)
+            distance += len(sentence.words)
+
+        window = list(middle)
+        words = [w for sentence in window for w in sentence.words]
+        ids = [i for sentence in window for i in sentence.ids]
+        offsets = []
+        offset = 0
+        for sentence in window:
+            offsets.append(offset)
+            offset += len(sentence.words)
+        n_middle = len(window)
+        next_tail = 0
+        matches: list[tuple[int, int, Optional[str], str, int]] = []
+        resync: Optional[tuple[int, int]] = None  # (window index, word offset)
+        current = 0  # Window index of the sentence containing `position`
+
+        def extend_window() -> bool:
+            # Bring the next unchanged sentence into the window, if any
+            nonlocal next_tail
+            if next_tail == len(tail):
+                return False
+            sentence = tail[next_tail]
+            next_tail += 1
+            self._count(sentence.matches, -1)
+            offsets.append(len(ids))
+            window.append(sentence)
+            words.extend(sentence.words)
+            ids.extend(sentence.ids)
+            return True
+
+        position = skip
+        while True:
+            if position >= len(ids):
+                if not extend_window():
+                    break
+                continue
+            while offsets[current] + len(window[current].words) <= position:
+                current += 1
+            if current >= n_middle:
+                # Unchanged text from here on: stop at the first old match start
+                relative = position - offsets[current]
+                if any(match[0] == relative for match in window[current].matches):
+                    resync = (current, relative)
+                    break
+            end, level, complete, probes = _longest_match(trie, ids, position)
+            if not complete and extend_window():
+                # The expression may continue into the next sentence
+                continue
+            if level is None:
+                end = position + 1
+            matches.append(
+                (position, end, level, " ".join(words[position:end]), position + probes)
+            )
+            position = end
+
+        # Hand each match to the sentence it starts in
+        per_sentence: list[list] = [[] for _ in window]
+        current = 0
+        for match in matches:
+            while offsets[current] + len(window[current].words) <= match[0]:
+                current += 1
+            start = offsets[current]
+            per_sentence[current].append(
+                (match[0] - start, match[1] - start, match[2], match[3], match[4] - start)
+            )
+        for index, sentence in enumerate(window):
+            if resync is not None and index == resync[0]:
+                kept = [m for m in sentence.matches if m[0] >= resync[1]]
+                sentence.matches = per_sentence[index] + kept
+            elif resync is None or index < resync[0]:
+                sentence.matches = per_sentence[index]
+            self._count(sentence.matches, 1)
+        return len(window) if resync is None else resync[0] + 1
+
+    def _count(self, matches: list, sign: int) -> None:
+        for _, _, level, expression, _ in matches:
+            level = level or "No results"
+            self._levels[level] += sign
+            self._expressions[expression] += sign
+            if self._expressions[expression] == 0:
+                del self._expressions[expression]
+            if level not in ("A0", "No results"):
+                self._found[(level, expression)] += sign
+                if self._found[(level, expression)] == 0:
+                    del self._found[(level, expression)]
+
+    def word_levels(self) -> list[tuple[str, str]]:
+        """Word-level assignments of the whole document, in order."""
+        return [
+            (expression, level or "No results")
+            for sentence in self._sentences
+            for _, _, level, expression, _ in sentence.matches
+        ]
+
+    def result(self) -> dict:
+        """The grading report of the current text."""
+        freq: Counter = Counter()
+        for level, count in self._levels.items():
+            freq[level if level in ALL_LEVELS else "A0"] += count
+        found_expressions: dict[str, list[str]] = {}
+        for level, expression in sorted(self._found):
+            found_expressions.setdefault(level, []).append(expression)
+        return _build_report(
+            freq=freq,
+            total_words=sum(self._levels.values()),
+            unique_words=len(self._expressions),
+            unknown_words=self._levels["A0"] + self._levels["No results"],
+            input_length=self._input_length,
+            found_expressions=found_expressions,
+        )
@@ -0,0 +1,79 @@
+"""
+Streaming grading for texts too large to hold in memory at once.
+"""
+
+from typing import Iterable, Iterator, Optional
+from .file_io import iter_text_chunks
+from .grader_prob import GradeAccumulator
+from .lemma_table import lemmatize_words
+from .profiling import Profile, profile_stage
+from .text_cleaning import extract_words
+from .word_level import StreamingMatcher
+
+
+class StreamingGrader:
+    """
+    Grades a text chunk by chunk. Multi-word expressions that span chunk
+    boundaries are carried over, and the report from result() after close()
+    is the same as grade_with_probabilities over the concatenated chunks.
+    Chunks must end at whitespace so no word is split between two chunks.
+    With profile=True, the report gets a "timings" section summed over all
+    chunks.
+    """
+
+    def __init__(self, profile: bool = False) -> None:
+        self._matcher = StreamingMatcher()
+        self._accumulator = GradeAccumulator()
+        self._profile = Profile() if profile else None
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """Grade the next chunk and return the word levels that are now final."""
+        profile = self._profile
+        with profile_stage(profile, "clean_text"):
+            words = extract_words(text=chunk)
+        with profile_stage(profile, "lemmatize"):
+            lemmas = lemmatize_words(words)
+        with profile_stage(profile, "match"):
+            word_levels = self._matcher.feed(words=words, lemmas=lemmas)
+        with profile_stage(profile, "score"):
+            self._accumulator.add(word_levels=word_levels, input_length=len(chunk))
+        return word_levels
+
+    def close(self) -> list[tuple[str, str]]:
+        """Finish the stream and return the remaining word levels."""
+        with profile_stage(self._profile, "match"):
+            word_levels = self._matcher.flush()
+        with profile_stage(self._profile, "score"):
+            self._accumulator.add(word_levels=word_levels)
+        return word_levels
+
+    def result(self) -> dict:
+        """Report over all word levels finalized so far."""
+        with profile_stage(self._profile, "score"):
+            result = self._accumulator.result()
+        if self._profile is not None:
+            result["timings"] = self._profile.report()
+        return result
+
+    def grade_chunks(self, chunks: Iterable[str]) -> Iterator[tuple[str, str]]:
+        """Feed all chunks and close the stream, yielding word levels as they are final."""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.close()
+
+
+def grade_file_streaming(
+    filepath: str, chunk_size: int = 65536, profile: bool = False
+) -> Optional[dict]:
+    """
+    Grade a text file in chunks of about `chunk_size` characters.
+    Returns the same report as grade_with_probabilities on the whole file,
+    or None if the file cannot be read.
+    """
+    chunks = iter_text_chunks(filepath=filepath, chunk_size=chunk_size)
+    if chunks is None:
+        return None
+    grader = StreamingGrader(profile=profile)
+    for _ in grader.grade_chunks(chunks):
+        pass
+    return grader.result()
@@ -2,33 +2,162 @@
 Text cleaning utilities for Spanish text analysis.
 """
 
+import os
 import re
+import threading
 import unicodedata
 import logging
+from collections import OrderedDict
+from typing import Iterable, Optional
+from .profiling import current_profile
 
-logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
 
-# Lazy loading for spacy model
+# Spanish spaCy model used for lemmatization, e.g. es_core_news_sm for a
+# smaller model without word vectors
+MODEL_NAME = os.environ.get("SALSA_SPACY_MODEL", "es_core_news_md")
+
+# Pipeline components that are not loaded at all. Lemmatization only runs
+# tok2vec, the morphologizer (whose POS tags the lemmatizer reads) and the
+# lemmatizer. "vectors" also skips the static word vectors, for models
+# whose tok2vec does not use them.
+DEFAULT_EXCLUDE = ("parser", "ner", "attribute_ruler", "senter")
+LEMMATIZER_COMPONENTS = ("tok2vec", "morphologizer", "lemmatizer")
+
+
+def _parse_components(value: str) -> tuple[str, ...]:
+    return tuple(name.strip() for name in value.split(",") if name.strip())
+
+
+EXCLUDE = _parse_components(os.environ.get("SALSA_SPACY_EXCLUDE", ",".join(DEFAULT_EXCLUDE)))
+
+# Joins the lemmas of the tokens of one word (see lemmatize_tokens); words
+# are runs of \w characters, so it never occurs in one
+LEMMA_JOINER = "+"
+
+# Lazy loading for spacy model; the lock makes concurrent first calls load it once
 _nlp = None
+_nlp_lock = threading.Lock()
+
+
+class LemmaCache:
+    """
+    Thread-safe, size-bounded LRU cache mapping texts to their lemmatization.
+    When full, the least recently used entry is evicted. A maxsize of 0
+    disables caching.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+    def _evict(self) -> None:
+        # Caller must hold the lock
+        while len(self._data) > max(self.maxsize, 0):
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+# Shared by lemmatize_word, lemmatize_text and the batched helpers
+lemma_cache = LemmaCache(maxsize=int(os.environ.get("SALSA_LEMMA_CACHE_SIZE", "100000")))
+
+
+def set_lemma_cache_size(maxsize: int) -> None:
+    """Change the lemma cache capacity, evicting entries if it shrinks."""
+    lemma_cache.resize(maxsize)
+
+
+def lemma_cache_stats() -> dict:
+    """Return hit, miss and eviction counters of the lemma cache."""
+    return lemma_cache.stats()
+
+
+def set_pipeline(model_name: Optional[str] = None, exclude: Optional[Iterable[str]] = None) -> None:
+    """
+    Change the spaCy model and the components excluded from it. The model
+    is reloaded on next use and the lemma cache is cleared. Use
+    salsa_spa.configure_nlp() to also drop the vocabulary built with the
+    previous model.
+    """
+    global MODEL_NAME, EXCLUDE, _nlp
+    with _nlp_lock:
+        if model_name is not None:
+            MODEL_NAME = model_name
+        if exclude is not None:
+            EXCLUDE = tuple(exclude)
+        _nlp = None
+        lemma_cache.clear()
+    missing = [name for name in LEMMATIZER_COMPONENTS if name in EXCLUDE]
+    if missing:
+        logger.warning(f"Excluding {', '.join(missing)} from {MODEL_NAME} breaks or changes lemmatization")
+
+
+def get_pipeline() -> tuple[str, tuple[str, ...]]:
+    """Return the spaCy model name and the excluded components."""
+    return MODEL_NAME, EXCLUDE
 
 
 def get_nlp():
     """Get or load the Spanish spacy model with only lemmatizer enabled, downloading it if necessary."""
     global _nlp
-    if _nlp is None:
-        import spacy
-        try:
-            # Load model and disable all components except lemmatizer
-            # Disable parser, ner, and other unnecessary components for efficiency
-            _nlp = spacy.load("es_core_news_md", disable=["parser", "ner", "attribute_ruler"])
-        except OSError:
-            logging.info("Spanish spacy model not found. Downloading es_core_news_md...")
-            import spacy.cli
-            spacy.cli.download("es_core_news_md", quiet=False)
-            # Load model and disable all components except lemmatizer
-            _nlp = spacy.load("es_core_news_md", disable=["parser", "ner", "attribute_ruler"])
-            logging.info("Spanish spacy model downloaded and loaded successfully.")
-    return _nlp
+    nlp = _nlp
+    if nlp is not None:
+        return nlp
+    with _nlp_lock:
+        if _nlp is None:
+            import spacy
+            try:
+                # Excluded components are not even loaded, unlike disabled ones
+                _nlp = spacy.load(MODEL_NAME, exclude=list(EXCLUDE))
+            except OSError:
+                logger.info(f"Spanish spacy model not found. Downloading {MODEL_NAME}...")
+                import spacy.cli
+                spacy.cli.download(MODEL_NAME, quiet=False)
+                _nlp = spacy.load(MODEL_NAME, exclude=list(EXCLUDE))
+                logger.info("Spanish spacy model downloaded and loaded successfully.")
+        return _nlp
 
 
 def clean_text(text: str) -> str:
@@ -39,6 +168,12 @@ def clean_text(text: str) -> str:
     return text
 
 
+def extract_words(text: str) -> list[str]:
+    # Extract words from cleaned text (preserving order and positions)
+    cleaned = clean_text(text=text)
+    return re.findall(r"\b\w+\b", cleaned)
+
+
 def clean_word(word: str) -> str:
     # Lowercase and remove accents using Unicode normalization
     word = word.lower()
@@ -50,15 +185,72 @@ def clean_word(word: str) -> str:
     return word
 
 
+def _lemmatize(text: str) -> str:
+    # Run a text through the pipeline, consulting the lemma cache first
+    lemmatized = lemma_cache.get(text)
+    if lemmatized is None:
+        doc = get_nlp()(text)
+        lemmatized = " ".join(token.lemma_ for token in doc)
+        lemma_cache.put(text, lemmatized)
+    return lemmatized
+
+
 def lemmatize_text(text: str) -> str:
     """
     Lemmatize a text string, handling multi-word phrases.
     Returns the lemmatized version of the text.
     """
-    nlp = get_nlp()
-    doc = nlp(text)
-    lemmas = [token.lemma_ for token in doc]
-    return " ".join(lemmas)
+    return _lemmatize(text)
+
+
+def lemmatize_batch(
+    texts: Iterable[str], batch_size: int = 1000, n_process: int = 1
+) -> list[str]:
+    """
+    Lemmatize many independent texts with nlp.pipe.
+    Each result is identical to calling lemmatize_word on that text.
+    Cached texts are served from the lemma cache; only the rest are piped.
+    """
+    texts = list(texts)
+    results: list[Optional[str]] = [lemma_cache.get(text) for text in texts]
+    missing = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+    profile = current_profile()
+    if profile is not None:
+        profile.count("lemma_cache_hits", sum(r is not None for r in results))
+        profile.count("lemma_cache_misses", len(missing))
+        profile.count("spacy_calls", 1 if missing else 0)
+        profile.count("spacy_docs", len(missing))
+    if missing:
+        nlp = get_nlp()
+        lemmatized = {}
+        docs = nlp.pipe(missing, batch_size=batch_size, n_process=n_process)
+        for text, doc in zip(missing, docs):
+            lemmatized[text] = " ".join(token.lemma_ for token in doc)
+            lemma_cache.put(text, lemmatized[text])
+        results = [lemmatized[t] if r is None else r for t, r in zip(texts, results)]
+    return results
+
+
+def lemmatize_tokens(
+    words: list[str], batch_size: int = 1000, n_process: int = 1
+) -> list[str]:
+    """
+    Lemmatize a pre-tokenized sequence of words in a single batched pass.
+    Each distinct word is lemmatized on its own, the same way vocabulary
+    entries are, so repeated words only go through the pipeline once.
+    Returns one lemma per input word, aligned with the input positions.
+    A word spaCy splits into several tokens (e.g. a verb and a clitic
+    pronoun: "comprarlo" -> "comprar él") gets their lemmas joined with
+    LEMMA_JOINER ("comprar+él"), so it still fills one position.
+    """
+    if not words:
+        return []
+    unique_words = list(dict.fromkeys(words))
+    lemmas = lemmatize_batch(unique_words, batch_size=batch_size, n_process=n_process)
+    lemma_map = {
+        word: LEMMA_JOINER.join(lemma.split()) for word, lemma in zip(unique_words, lemmas)
+    }
+    return [lemma_map[word] for word in words]
 
 
 def lemmatize_word(word: str) -> str:
@@ -66,7 +258,4 @@ def lemmatize_word(word: str) -> str:
     Lemmatize a single word or phrase.
     For phrases, lemmatizes each word and joins them.
     """
-    nlp = get_nlp()
-    doc = nlp(word)
-    lemmas = [token.lemma_ for token in doc]
-    return " ".join(lemmas)
+    return _lemmatize(word)
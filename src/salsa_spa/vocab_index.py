@@ -0,0 +1,148 @@
+"""
+On-disk vocabulary index for salsa-spa.
+The processed vocabulary is stored in the user cache directory, in a
+compact binary file named after a hash of everything it depends on: the
+vocabulary CSV contents, the spaCy model name and version, the pipeline
+components excluded from the model, the library version and the index
+format version.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from importlib import metadata
+from typing import Iterable, Optional
+from .expression_trie import ExpressionTrie
+from .file_io import get_cache_dir, write_file_atomic
+
+# Bump when the processed vocabulary or the file layout changes
+INDEX_FORMAT_VERSION = 5
+
+# File layout: fixed header, JSON metadata, then the sections listed in the
+# metadata: the trie's lemmas as newline-separated UTF-8, its node arrays
+# as raw machine values (including the derived best and root_children, so
+# loading does not recompute them), and tab-separated surface form / lemma
+# lines. Sections start at multiples of 8 bytes.
+INDEX_MAGIC = b"SALSAVOC"
+_HEADER = struct.Struct("<8sII")  # magic, format version, metadata length
+_TRIE_ARRAYS = ("first_child", "child_lemmas", "child_nodes", "masks", "best", "root_children")
+_ALIGNMENT = 8
+
+
+def package_version(name: str) -> str:
+    # Installed version of a distribution, without importing it
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def index_key(csv_path: str, model_name: str, exclude: Iterable[str] = ()) -> str:
+    """Hash of the inputs the processed vocabulary depends on."""
+    digest = hashlib.sha256()
+    for part in (
+        str(INDEX_FORMAT_VERSION),
+        model_name,
+        package_version(model_name),
+        ",".join(sorted(exclude)),
+        package_version("salsa-spa"),
+    ):
+        digest.update(part.encode("utf-8") + b"\0")
+    with open(csv_path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:32]
+
+
+def index_path(key: str) -> str:
+    return os.path.join(get_cache_dir(), f"vocab-{key}.idx")
+
+
+def write_index(
+    path: str,
+    key: str,
+    trie: ExpressionTrie,
+    form_lemmas: dict[str, str],
+    info: dict,
+) -> None:
+    """
+    Write the vocabulary trie and the form -> lemma table to `path`.
+    The file is replaced atomically, so concurrent readers never see a
+    partial index.
+    """
+    forms = "\n".join(f"{form}\t{lemma}" for form, lemma in sorted(form_lemmas.items()))
+    data = {
+        "lemmas": "\n".join(trie.lemmas).encode("utf-8"),
+        **{name: getattr(trie, name).tobytes() for name in _TRIE_ARRAYS},
+        "forms": forms.encode("utf-8"),
+    }
+    chunks = []
+    sections = {}
+    offset = 0
+    for name, section in data.items():
+        padding = -offset % _ALIGNMENT
+        chunks.append(b"\0" * padding)
+        offset += padding
+        chunks.append(section)
+        sections[name] = {"offset": offset, "size": len(section)}
+        offset += len(section)
+    header = json.dumps(
+        {
+            "key": key,
+            "info": info,
+            "byteorder": sys.byteorder,
+            "n_lemmas": len(trie.lemmas),
+            "max_length": trie.max_length,
+            "typecodes": {name: getattr(trie, name).typecode for name in _TRIE_ARRAYS},
+            "itemsizes": {name: getattr(trie, name).itemsize for name in _TRIE_ARRAYS},
+            "sections": sections,
+        }
+    ).encode("utf-8")
+    # Trailing spaces are valid JSON and align the first section
+    header += b" " * (-(_HEADER.size + len(header)) % _ALIGNMENT)
+
+    write_file_atomic(
+        path,
+        [_HEADER.pack(INDEX_MAGIC, INDEX_FORMAT_VERSION, len(header)), header, *chunks],
+    )
+
+
+def read_index(path: str, key: str) -> Optional[tuple[ExpressionTrie, dict[str, str]]]:
+    """
+    Read (trie, form_lemmas) from `path`, or return None if the file was
+    not written for `key` or on a machine with a different array layout.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, version, header_length = _HEADER.unpack_from(mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_FORMAT_VERSION:
+            return None
+        header = json.loads(mm[_HEADER.size:_HEADER.size + header_length])
+        if header["key"] != key or header["byteorder"] != sys.byteorder:
+            return None
+        base = _HEADER.size + header_length
+
+        def section(name: str) -> bytes:
+            start = base + header["sections"][name]["offset"]
+            return mm[start:start + header["sections"][name]["size"]]
+
+        arrays = {}
+        for name in _TRIE_ARRAYS:
+            values = array(header["typecodes"][name])
+            if values.itemsize != header["itemsizes"][name]:
+                return None
+            values.frombytes(section(name))
+            arrays[name] = values
+        lemmas = section("lemmas").decode("utf-8").split("\n") if header["n_lemmas"] else []
+        forms = section("forms").decode("utf-8")
+    trie = ExpressionTrie(lemmas, max_length=header["max_length"], **arrays)
+    # Lemmas of the vocabulary share the trie's string objects
+    lemma_strings = dict(zip(lemmas, lemmas))
+    form_lemmas = {}
+    if forms:
+        for line in forms.split("\n"):
+            form, lemma = line.split("\t", 1)
+            form_lemmas[form] = lemma_strings.get(lemma, lemma)
+    return trie, form_lemmas
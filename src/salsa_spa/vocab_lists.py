@@ -1,111 +1,244 @@
 """
 Vocabulary lists loader for salsa-spa.
 Loads CEFR word lists from a CSV file and lemmatizes them.
-Uses a cache file to avoid reprocessing on every import.
+The vocabulary is loaded on first use, from the on-disk index in the
+user cache directory when possible (see vocab_index), and kept in memory
+as a compact ExpressionTrie. The level_dict and level_dict_by_length
+views are rebuilt from the trie only when they are accessed.
 """
 
 import csv
 import os
 import logging
-import pickle
+import threading
 from typing import Optional, Tuple
-from .text_cleaning import lemmatize_word
+from .expression_trie import ExpressionTrie, build_expression_trie
+from .text_cleaning import extract_words, get_pipeline, lemmatize_batch, lemmatize_tokens
+from .vocab_index import index_key, index_path, package_version, read_index, write_index
 
-logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
 
 VOCAB_CSV_PATH = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "vocab", "all_vocab_levels.csv")
 )
 
-# Cache file path (hidden file in the vocab directory)
-CACHE_DIR = os.path.dirname(VOCAB_CSV_PATH)
-CACHE_FILE = os.path.join(CACHE_DIR, ".vocab_cache.pkl")
+# nlp.pipe settings used when lemmatizing the vocabulary CSV
+VOCAB_BATCH_SIZE = int(os.environ.get("SALSA_VOCAB_BATCH_SIZE", "1000"))
+VOCAB_N_PROCESS = int(os.environ.get("SALSA_VOCAB_N_PROCESS", "1"))
 
-level_dict: dict[str, set[str]] = {}
-# Dictionary organized by expression length for efficient matching
-level_dict_by_length: dict[str, dict[int, set[str]]] = {}
+# Loaded lazily by _load(): the vocabulary trie, and the surface form ->
+# lemma mapping of every word of the vocabulary CSV (see lemma_table)
+_trie: Optional[ExpressionTrie] = None
+_form_lemmas: Optional[dict[str, str]] = None
+# Views built from _trie on first access; also exposed as the module
+# attributes level_dict and level_dict_by_length (organized by expression length)
+_level_dict: Optional[dict[str, set[str]]] = None
+_level_dict_by_length: Optional[dict[str, dict[int, set[str]]]] = None
+# Held while loading, so concurrent first calls load (or build) the vocabulary once
+_load_lock = threading.Lock()
 
 
-def _load_from_cache() -> Optional[Tuple[dict[str, set[str]], dict[str, dict[int, set[str]]]]]:
-    """Load processed vocabulary from cache if it exists and is valid."""
-    if not os.path.exists(CACHE_FILE):
-        return None
-    
+def _load_from_cache() -> Optional[Tuple[ExpressionTrie, dict[str, str]]]:
+    """Load the processed vocabulary from the index if it exists and is valid."""
     try:
-        # Check if cache is newer than CSV
-        cache_mtime = os.path.getmtime(CACHE_FILE)
-        csv_mtime = os.path.getmtime(VOCAB_CSV_PATH)
-        
-        if cache_mtime < csv_mtime:
-            # CSV is newer, cache is invalid
-            logging.info("Vocabulary CSV is newer than cache, will reprocess...")
+        key = index_key(VOCAB_CSV_PATH, *get_pipeline())
+        path = index_path(key)
+        if not os.path.exists(path):
             return None
-        
-        # Load from cache
-        with open(CACHE_FILE, "rb") as f:
-            cached_data = pickle.load(f)
-            return cached_data.get("level_dict"), cached_data.get("level_dict_by_length")
+        cached_result = read_index(path, key)
+        if cached_result is None:
+            logger.info("Vocabulary index is outdated, will reprocess...")
+        return cached_result
     except Exception as e:
-        logging.warning(f"Error loading cache: {e}. Will reprocess vocabulary.")
+        logger.warning(f"Error loading vocabulary index: {e}. Will reprocess vocabulary.")
         return None
 
 
-def _save_to_cache(level_dict: dict[str, set[str]], level_dict_by_length: dict[str, dict[int, set[str]]]) -> None:
-    """Save processed vocabulary to cache."""
+def _save_to_cache(trie: ExpressionTrie, form_lemmas: Optional[dict[str, str]] = None) -> None:
+    """Save the processed vocabulary to the index in the cache directory."""
     try:
-        cached_data = {
-            "level_dict": level_dict,
-            "level_dict_by_length": level_dict_by_length,
+        model_name, exclude = get_pipeline()
+        key = index_key(VOCAB_CSV_PATH, model_name, exclude)
+        path = index_path(key)
+        info = {
+            "model": model_name,
+            "model_version": package_version(model_name),
+            "exclude": list(exclude),
+            "library_version": package_version("salsa-spa"),
         }
-        with open(CACHE_FILE, "wb") as f:
-            pickle.dump(cached_data, f)
-        logging.info(f"Vocabulary cache saved to {CACHE_FILE}")
+        write_index(path, key, trie, form_lemmas or {}, info)
+        logger.info(f"Vocabulary index saved to {path}")
     except Exception as e:
-        logging.warning(f"Error saving cache: {e}")
+        # E.g. a read-only cache directory: keep working from memory
+        logger.warning(f"Could not save vocabulary index: {e}")
 
 
-def _process_vocabulary() -> Tuple[dict[str, set[str]], dict[str, dict[int, set[str]]]]:
-    """Process vocabulary CSV and return processed dictionaries."""
-    level_dict_result: dict[str, set[str]] = {}
-    level_dict_by_length_result: dict[str, dict[int, set[str]]] = {}
-    
-    logging.info("Processing vocabulary CSV (this may take a moment)...")
+def _group_by_length(level_dict: dict[str, set[str]]) -> dict[str, dict[int, set[str]]]:
+    # Organize each level's expressions by word count for efficient matching
+    level_dict_by_length: dict[str, dict[int, set[str]]] = {}
+    for level, expressions in level_dict.items():
+        length_dict = level_dict_by_length.setdefault(level, {})
+        for expression in expressions:
+            length_dict.setdefault(len(expression.split()), set()).add(expression)
+    return level_dict_by_length
+
+
+def _read_vocabulary_rows() -> list[tuple[str, str]]:
+    """Read (word, level) rows from the vocabulary CSV."""
     with open(VOCAB_CSV_PATH, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            word = row["word"]
-            level = row["level"]
-            # Lemmatize the word before adding to dictionary
-            lemmatized_word = lemmatize_word(word)
-            if level not in level_dict_result:
-                level_dict_result[level] = set()
-            level_dict_result[level].add(lemmatized_word)
-            
-            # Also organize by length for efficient matching
-            if level not in level_dict_by_length_result:
-                level_dict_by_length_result[level] = {}
-            word_count = len(lemmatized_word.split())
-            if word_count not in level_dict_by_length_result[level]:
-                level_dict_by_length_result[level][word_count] = set()
-            level_dict_by_length_result[level][word_count].add(lemmatized_word)
-    
-    logging.info("Vocabulary processing complete.")
-    return level_dict_result, level_dict_by_length_result
-
-
-# Load vocabulary (from cache if available, otherwise process and cache)
-try:
-    cached_result = _load_from_cache()
-    if cached_result is not None:
-        level_dict, level_dict_by_length = cached_result
-        logging.info("Vocabulary loaded from cache.")
-    else:
-        level_dict, level_dict_by_length = _process_vocabulary()
-        _save_to_cache(level_dict, level_dict_by_length)
-except Exception as e:
-    logging.error(f"Error loading vocabulary: {e}")
-    raise
-
-# level_dict: { 'A1': set([...]), 'A2': set([...]), ... }
-# level_dict_by_length: { 'A1': {1: set([...]), 2: set([...]), ...}, ... }
-# All words in the dictionary are lemmatized
+        return [(row["word"], row["level"]) for row in csv.DictReader(f)]
+
+
+def build_vocabulary(
+    rows: list[tuple[str, str]],
+    batch_size: Optional[int] = None,
+    n_process: Optional[int] = None,
+) -> Tuple[dict[str, set[str]], dict[str, dict[int, set[str]]]]:
+    """
+    Lemmatize (word, level) rows and assemble level_dict and level_dict_by_length.
+    Rows are streamed through nlp.pipe in batches of `batch_size`, using
+    `n_process` worker processes; the output does not depend on either.
+    """
+    batch_size = batch_size or VOCAB_BATCH_SIZE
+    n_process = n_process or VOCAB_N_PROCESS
+    level_dict_result: dict[str, set[str]] = {}
+
+    # Lemmatize each expression as a whole
+    lemmatized_words = lemmatize_batch(
+        (word for word, _ in rows), batch_size=batch_size, n_process=n_process
+    )
+
+    # Texts are lemmatized word by word (see lemmatize_tokens), so each
+    # expression is also indexed under its word-by-word lemmas, one lemma
+    # per word even where spaCy splits a word into several tokens. The
+    # distinct words of all rows are lemmatized together in one batched pass.
+    row_words = [extract_words(text=word) for word, _ in rows]
+    all_words = [w for words in row_words for w in words]
+    token_lemmas = dict(
+        zip(
+            all_words,
+            lemmatize_tokens(all_words, batch_size=batch_size, n_process=n_process),
+        )
+    )
+
+    for (word, level), lemmatized_word, words in zip(rows, lemmatized_words, row_words):
+        keys = [" ".join(lemmatized_word.split())]
+        if words:
+            keys.append(" ".join(token_lemmas[w] for w in words))
+
+        if level not in level_dict_result:
+            level_dict_result[level] = set()
+        level_dict_result[level].update(keys)
+
+    return level_dict_result, _group_by_length(level_dict_result)
+
+
+def build_form_lemmas(
+    rows: list[tuple[str, str]],
+    batch_size: Optional[int] = None,
+    n_process: Optional[int] = None,
+) -> dict[str, str]:
+    """
+    Map every word occurring in the vocabulary rows to its lemma, exactly as
+    lemmatize_tokens would lemmatize it in a text.
+    """
+    words = list(dict.fromkeys(w for word, _ in rows for w in extract_words(text=word)))
+    lemmas = lemmatize_tokens(
+        words, batch_size=batch_size or VOCAB_BATCH_SIZE, n_process=n_process or VOCAB_N_PROCESS
+    )
+    return dict(zip(words, lemmas))
+
+
+def _process_vocabulary(
+    batch_size: Optional[int] = None, n_process: Optional[int] = None
+) -> Tuple[dict[str, set[str]], dict[str, dict[int, set[str]]], dict[str, str]]:
+    """Process vocabulary CSV and return processed dictionaries."""
+    logger.info("Processing vocabulary CSV (this may take a moment)...")
+    rows = _read_vocabulary_rows()
+    level_dict, level_dict_by_length = build_vocabulary(
+        rows, batch_size=batch_size, n_process=n_process
+    )
+    # The words were just lemmatized, so this is served by the lemma cache
+    form_lemmas = build_form_lemmas(rows, batch_size=batch_size, n_process=n_process)
+    logger.info("Vocabulary processing complete.")
+    return level_dict, level_dict_by_length, form_lemmas
+
+
+def _load() -> None:
+    """
+    Load the vocabulary trie and form lemmas on first call, from the cache
+    if available, otherwise processing and caching the CSV.
+    """
+    global _trie, _form_lemmas
+    if _trie is not None:
+        return
+    with _load_lock:
+        if _trie is not None:
+            return
+        try:
+            cached_result = _load_from_cache()
+            if cached_result is not None:
+                trie, form_lemmas = cached_result
+                logger.info("Vocabulary loaded from cache.")
+            else:
+                _, level_dict_by_length, form_lemmas = _process_vocabulary()
+                # Only the trie is kept; the string sets are released
+                trie = build_expression_trie(level_dict_by_length)
+                _save_to_cache(trie, form_lemmas)
+        except Exception as e:
+            logger.error(f"Error loading vocabulary: {e}")
+            raise
+        # Readers check _trie without the lock, so it is set last
+        _form_lemmas = form_lemmas
+        _trie = trie
+
+
+def clear_vocabulary() -> None:
+    """Drop the loaded vocabulary, e.g. after changing the spaCy model."""
+    global _trie, _form_lemmas, _level_dict, _level_dict_by_length
+    with _load_lock:
+        _trie = _form_lemmas = _level_dict = _level_dict_by_length = None
+
+
+def load_vocabulary() -> Tuple[dict[str, set[str]], dict[str, dict[int, set[str]]]]:
+    """Return (level_dict, level_dict_by_length), loading the vocabulary if needed."""
+    global _level_dict, _level_dict_by_length
+    if _level_dict is None or _level_dict_by_length is None:
+        level_dict_by_length = get_vocabulary_trie().level_dict_by_length()
+        _level_dict = {
+            level: set().union(*length_dict.values())
+            for level, length_dict in level_dict_by_length.items()
+        }
+        _level_dict_by_length = level_dict_by_length
+    return _level_dict, _level_dict_by_length
+
+
+def get_vocabulary_trie() -> ExpressionTrie:
+    # Compact trie of all lemmatized expressions, used for matching
+    _load()
+    return _trie
+
+
+def get_level_dict() -> dict[str, set[str]]:
+    # level_dict: { 'A1': set([...]), 'A2': set([...]), ... }
+    return load_vocabulary()[0]
+
+
+def get_level_dict_by_length() -> dict[str, dict[int, set[str]]]:
+    # level_dict_by_length: { 'A1': {1: set([...]), 2: set([...]), ...}, ... }
+    return load_vocabulary()[1]
+
+
+def get_form_lemmas() -> dict[str, str]:
+    # form_lemmas: { 'gafas': 'gafa', 'llevaba': 'llevar', ... }
+    _load()
+    return _form_lemmas
+
+
+def __getattr__(name: str):
+    # Keep `from .vocab_lists import level_dict` working without loading at import
+    if name == "level_dict":
+        return get_level_dict()
+    if name == "level_dict_by_length":
+        return get_level_dict_by_length()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
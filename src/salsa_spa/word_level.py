@@ -2,71 +2,185 @@
 Word level detection logic for Spanish text analysis.
 """
 
-import re
-import logging
-from .text_cleaning import clean_text, lemmatize_word
-from .vocab_lists import level_dict_by_length
+from bisect import bisect_left
+from typing import Optional
+from .expression_trie import LEVEL_ORDER, NO_ID, ExpressionTrie, build_expression_trie
+from .lemma_table import lemmatize_words
+from .profiling import Profile, current_profile, profile_stage
+from .text_cleaning import extract_words
+from .vocab_lists import get_level_dict_by_length, get_vocabulary_trie
+from . import vocab_lists
 
-logging.basicConfig(level=logging.INFO, format="%(message)s")
+# Trie built from a level_dict_by_length assigned on this module, if any
+_trie_source: Optional[dict[str, dict[int, set[str]]]] = None
+_trie: Optional[ExpressionTrie] = None
 
-# CEFR level order (highest to lowest)
-LEVEL_ORDER = ["C2", "C1", "B2", "B1", "A2", "A1", "A0"]
 
+def get_expression_trie() -> ExpressionTrie:
+    """Return the trie for the current vocabulary, loading it on first use."""
+    global _trie_source, _trie
+    # A level_dict_by_length assigned on this module takes precedence over
+    # the lazily loaded vocabulary, unless it is that vocabulary itself (as
+    # left behind by `word_level.level_dict_by_length = original`)
+    overridden = globals().get("level_dict_by_length")
+    if overridden is None or overridden is vocab_lists._level_dict_by_length:
+        return get_vocabulary_trie()
+    if _trie is None or _trie_source is not overridden:
+        _trie = build_expression_trie(overridden)
+        _trie_source = overridden
+    return _trie
 
-def detect_word_levels(
-    text: str, level_dictionary: dict[str, set[str]]
-) -> list[tuple[str, str]]:
+
+def _longest_match(
+    trie: ExpressionTrie, ids: list[int], start: int
+) -> tuple[int, Optional[str], bool, int]:
     """
-    Detect word levels based on predefined word lists.
-    Matches full expressions only - no partial matches allowed.
+    Walk the trie over the lemma IDs from `start`, remembering the longest
+    complete match. Returns (end, level, complete, probes): `level` is None
+    if nothing matched, `complete` is False if the walk ran off the end of
+    `ids` while a longer expression could still have matched, and `probes`
+    is the number of n-gram lookups made.
     """
-    # Extract words from cleaned text (preserving order and positions)
-    cleaned = clean_text(text=text)
-    words = re.findall(r"\b\w+\b", cleaned)
-    
-    if not words:
-        return []
-    
-    # Find maximum expression length in vocabulary
-    max_length = 1
-    for level, length_dict in level_dict_by_length.items():
-        if length_dict:
-            max_length = max(max_length, max(length_dict.keys()))
-    
+    n_ids = len(ids)
+    if start >= n_ids:
+        return start, None, True, 0
+    # Most walks stop at the first or second lemma, so the root step is
+    # done on its own before loading the arrays of deeper nodes
+    lemma_id = ids[start]
+    node = trie.root_children[lemma_id] if lemma_id != NO_ID else NO_ID
+    if node == NO_ID:
+        return start, None, True, 1
+    best = trie.best
+    first_child = trie.first_child
+    child_lemmas = trie.child_lemmas
+    if best[node] >= 0:
+        match_level = LEVEL_ORDER[best[node]]
+        match_end = start + 1
+    else:
+        match_level = None
+        match_end = start
+    j = start + 1
+    while j < n_ids:
+        lo = first_child[node]
+        hi = first_child[node + 1]
+        if lo == hi:
+            return match_end, match_level, True, j - start
+        lemma_id = ids[j]
+        i = bisect_left(child_lemmas, lemma_id, lo, hi)
+        if i == hi or child_lemmas[i] != lemma_id:
+            return match_end, match_level, True, j - start + 1
+        node = trie.child_nodes[i]
+        j += 1
+        if best[node] >= 0:
+            match_level = LEVEL_ORDER[best[node]]
+            match_end = j
+    return match_end, match_level, first_child[node] == first_child[node + 1], j - start
+
+
+def match_word_levels(words: list[str], lemmas: list[str]) -> list[tuple[str, str]]:
+    """
+    Match vocabulary expressions against an already lemmatized word sequence.
+    `lemmas[i]` must be the lemma of `words[i]`. Longer expressions are
+    matched first, and higher levels win when an expression is in several.
+    """
+    trie = get_expression_trie()
+    ids = trie.encode(lemmas)
     result = []
     i = 0
-    
-    # Process words sequentially, trying longest matches first
+    probes = 0
+
+    # Walk the trie from each position, taking the longest complete match
     while i < len(words):
-        matched = False
-        
-        # Try matching expressions from longest to shortest starting at position i
-        for n in range(min(max_length, len(words) - i), 0, -1):
-            # Extract n-gram
-            ngram_words = words[i:i + n]
-            ngram_text = " ".join(ngram_words)
-            
-            # Lemmatize the n-gram
-            lemmatized_ngram = lemmatize_word(ngram_text)
-            
-            # Try to match against vocabulary of the same length
-            # Check levels from highest to lowest to prioritize higher levels
-            for level in LEVEL_ORDER:
-                if level in level_dict_by_length:
-                    length_dict = level_dict_by_length[level]
-                    if n in length_dict and lemmatized_ngram in length_dict[n]:
-                        # Full match found at this level
-                        result.append((ngram_text, level))
-                        i += n  # Skip all words in this expression
-                        matched = True
-                        break
-            
-            if matched:
-                break
-        
-        if not matched:
+        match_end, match_level, _, walked = _longest_match(trie, ids, i)
+        probes += walked
+        if match_level is None:
             # No match found for word at position i
             result.append((words[i], "No results"))
             i += 1
-    
+        else:
+            result.append((" ".join(words[i:match_end]), match_level))
+            i = match_end  # Skip all words in this expression
+
+    profile = current_profile()
+    if profile is not None:
+        profile.count("ngram_probes", probes)
     return result
+
+
+class StreamingMatcher:
+    """
+    Incremental version of match_word_levels for text that arrives in chunks.
+    Words whose match could still be extended by the next chunk are held
+    back, so multi-word expressions spanning chunk boundaries are found and
+    the concatenated output equals match_word_levels over the whole text.
+    """
+
+    def __init__(self) -> None:
+        self._words: list[str] = []
+        self._ids: list[int] = []
+
+    def feed(self, words: list[str], lemmas: list[str]) -> list[tuple[str, str]]:
+        """Add the next chunk and return the matches that are now final."""
+        self._words.extend(words)
+        self._ids.extend(get_expression_trie().encode(lemmas))
+        return self._drain(final=False)
+
+    def flush(self) -> list[tuple[str, str]]:
+        """Return the matches for any held-back words at the end of the stream."""
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> list[tuple[str, str]]:
+        trie = get_expression_trie()
+        result = []
+        i = 0
+        probes = 0
+        while i < len(self._words):
+            match_end, match_level, complete, walked = _longest_match(trie, self._ids, i)
+            probes += walked
+            if not complete and not final:
+                break
+            if match_level is None:
+                result.append((self._words[i], "No results"))
+                i += 1
+            else:
+                result.append((" ".join(self._words[i:match_end]), match_level))
+                i = match_end
+        # Keep only the pending tail, which is shorter than the longest expression
+        del self._words[:i]
+        del self._ids[:i]
+        profile = current_profile()
+        if profile is not None:
+            profile.count("ngram_probes", probes)
+        return result
+
+
+def detect_word_levels(
+    text: str,
+    level_dictionary: Optional[dict[str, set[str]]] = None,
+    profile: Optional[Profile] = None,
+) -> list[tuple[str, str]]:
+    """
+    Detect word levels based on predefined word lists.
+    Matches full expressions only - no partial matches allowed.
+    The text is lemmatized once; n-grams are matched against slices of
+    the resulting lemma sequence. Stage timings are recorded in `profile`
+    if one is given. `level_dictionary` is not used: matching always runs
+    on the current vocabulary trie. It is accepted for compatibility.
+    """
+    with profile_stage(profile, "clean_text"):
+        words = extract_words(text=text)
+
+    if not words:
+        return []
+
+    with profile_stage(profile, "lemmatize"):
+        lemmas = lemmatize_words(words)
+    with profile_stage(profile, "match"):
+        return match_word_levels(words=words, lemmas=lemmas)
+
+
+def __getattr__(name: str):
+    # level_dict_by_length is loaded on first access rather than at import
+    if name == "level_dict_by_length":
+        return get_level_dict_by_length()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
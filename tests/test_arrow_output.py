@@ -0,0 +1,70 @@
+"""
+Tests for salsa_spa/arrow_output.py Parquet and Arrow output.
+"""
+
+import pytest
+from salsa_spa.arrow_output import ArrowResultWriter, write_arrow_results
+from salsa_spa.batch_grading import grade_documents
+from salsa_spa.grader_prob import ALL_LEVELS, grade_with_probabilities
+
+pa = pytest.importorskip("pyarrow")
+
+TEXTS = [
+    "El niño lleva gafas y juega en el parque.",
+    "La jurisprudencia del tribunal constitucional resulta ineludible.",
+    "bailar con el presidente",
+]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_write_arrow_results(tmp_path, file_format):
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    path = str(tmp_path / f"grades.{file_format}")
+    words_path = str(tmp_path / f"words.{file_format}")
+    results = grade_documents(list(enumerate(TEXTS)))
+    assert write_arrow_results(results, path, words_path=words_path, file_format=file_format) == 3
+
+    read = pyarrow.parquet.read_table if file_format == "parquet" else pyarrow.feather.read_table
+    documents = read(path).to_pylist()
+    words = read(words_path).to_pylist()
+    for i, (text, row) in enumerate(zip(TEXTS, documents)):
+        result, word_level_dict = grade_with_probabilities(text)
+        assert row["id"] == str(i)
+        assert row["grade"] == result["grade"]
+        assert row["predicted_level"] == result["predicted_level"]
+        assert row["confidence"] == result["confidence"]
+        for level in ALL_LEVELS:
+            assert row[f"probability_{level}"] == result["probabilities"][level]
+        for stat, value in result["stats"].items():
+            assert row[stat] == value
+        assert {w["expression"]: w["level"] for w in words if w["id"] == str(i)} == word_level_dict
+
+
+def test_writes_in_record_batches(tmp_path):
+    import pyarrow.ipc
+
+    path = str(tmp_path / "grades.arrow")
+    result, _ = grade_with_probabilities(TEXTS[0])
+    with ArrowResultWriter(path, batch_size=2) as writer:
+        for i in range(5):
+            writer.write(i, result)
+    with pyarrow.ipc.open_file(path) as reader:
+        assert reader.num_record_batches == 3
+        assert reader.read_all().num_rows == 5
+
+
+def test_word_table_has_one_row_per_distinct_expression(tmp_path):
+    import pyarrow.feather
+
+    path = str(tmp_path / "grades.arrow")
+    words_path = str(tmp_path / "words.arrow")
+    text = "lleva gafas y lleva gafas, bailar y lleva gafas"
+    write_arrow_results(grade_documents([("doc", text)]), path, words_path=words_path)
+    words = pyarrow.feather.read_table(words_path).to_pylist()
+    expressions = [row["expression"] for row in words]
+    # Repeated matches are written once, in order of first occurrence
+    assert expressions.count("lleva gafas") == 1
+    assert expressions == list(dict.fromkeys(expressions))
+    assert expressions == list(grade_with_probabilities(text)[1])
@@ -0,0 +1,112 @@
+"""
+Tests for salsa_spa/async_grading.py and thread-safe lazy initialization.
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+from salsa_spa import text_cleaning, vocab_lists
+from salsa_spa.async_grading import AsyncGrader, grade_async
+from salsa_spa.grader_prob import grade_many, grade_with_probabilities
+
+TEXTS = [
+    "El niño lleva gafas y juega en el parque.",
+    "La jurisprudencia del tribunal constitucional resulta ineludible.",
+    "Me gusta bailar con mis amigos.",
+]
+
+
+def run_concurrently(func, n_threads=8):
+    barrier = threading.Barrier(n_threads)
+    results = []
+
+    def target():
+        barrier.wait()
+        results.append(func())
+
+    threads = [threading.Thread(target=target) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_get_nlp_loads_once(monkeypatch):
+    import spacy
+
+    loads = []
+    real_load = spacy.load
+
+    def slow_load(*args, **kwargs):
+        loads.append(args)
+        time.sleep(0.05)
+        return real_load(*args, **kwargs)
+
+    monkeypatch.setattr(text_cleaning, "_nlp", None)
+    monkeypatch.setattr(spacy, "load", slow_load)
+    results = run_concurrently(text_cleaning.get_nlp)
+    assert len(loads) == 1
+    assert all(nlp is results[0] for nlp in results)
+
+
+def test_vocabulary_loads_once(monkeypatch):
+    calls = []
+    real_load = vocab_lists._load_from_cache
+
+    def slow_load_from_cache():
+        calls.append(1)
+        time.sleep(0.05)
+        return real_load()
+
+    monkeypatch.setattr(vocab_lists, "_trie", None)
+    monkeypatch.setattr(vocab_lists, "_form_lemmas", None)
+    monkeypatch.setattr(vocab_lists, "_load_from_cache", slow_load_from_cache)
+    results = run_concurrently(vocab_lists.get_vocabulary_trie)
+    assert len(calls) == 1
+    assert all(trie is results[0] for trie in results)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_async_grader(executor):
+    expected = [grade_with_probabilities(text) for text in TEXTS]
+
+    async def main():
+        async with AsyncGrader(executor=executor, max_workers=2) as grader:
+            single = await asyncio.gather(*(grader.grade(text) for text in TEXTS))
+            many = await grader.grade_many(TEXTS, batch_size=2)
+        return single, many
+
+    single, many = asyncio.run(main())
+    assert single == expected
+    assert many == list(grade_many(TEXTS))
+
+
+def test_concurrency_limit():
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work(_):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+
+    async def main():
+        grader = AsyncGrader(max_workers=8, max_concurrency=2)
+        await asyncio.gather(*(grader._run(work, i) for i in range(8)))
+        grader.close()
+
+    asyncio.run(main())
+    assert peak == 2
+
+
+def test_grade_async_across_event_loops():
+    expected = grade_with_probabilities(TEXTS[0])
+    assert asyncio.run(grade_async(TEXTS[0])) == expected
+    assert asyncio.run(grade_async(TEXTS[0])) == expected
@@ -0,0 +1,63 @@
+"""
+Tests for salsa_spa/batch_grading.py directory and JSONL grading.
+"""
+
+import io
+import json
+from salsa_spa.batch_grading import (
+    grade_documents,
+    read_jsonl_documents,
+    read_text_documents,
+    write_jsonl_results,
+)
+from salsa_spa.grader_prob import grade_with_probabilities
+
+TEXTS = [
+    "El niño lleva gafas y juega en el parque.",
+    "La jurisprudencia del tribunal constitucional resulta ineludible.",
+    "Me gusta bailar con mis amigos.",
+    "bailar con el presidente",
+    "hola",
+]
+
+
+def test_read_text_documents(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "b.txt").write_text("dos", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("uno", encoding="utf-8")
+    (tmp_path / "sub" / "c.txt").write_text("tres", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("no", encoding="utf-8")
+    assert list(read_text_documents(str(tmp_path))) == [
+        ("a.txt", "uno"),
+        ("b.txt", "dos"),
+        ("sub/c.txt", "tres"),
+    ]
+    assert list(read_text_documents(str(tmp_path), pattern="*.md")) == [("notes.md", "no")]
+
+
+def test_read_jsonl_documents(tmp_path):
+    path = tmp_path / "docs.jsonl"
+    path.write_text(
+        '{"id": "x", "text": "hola"}\n\n{"id": "y"}\nnot json\n{"id": "z", "text": "adiós"}\n',
+        encoding="utf-8",
+    )
+    assert list(read_jsonl_documents(str(path))) == [(1, "hola"), (5, "adiós")]
+    assert list(read_jsonl_documents(str(path), id_field="id")) == [("x", "hola"), ("z", "adiós")]
+
+
+def test_grade_documents_ordered_and_unordered():
+    documents = list(enumerate(TEXTS))
+    expected = [(i, *grade_with_probabilities(text)) for i, text in documents]
+    assert list(grade_documents(documents, batch_size=2)) == expected
+    unordered = list(grade_documents(documents, batch_size=2, n_process=2, ordered=False))
+    assert sorted(unordered, key=lambda item: item[0]) == expected
+    assert list(grade_documents(documents, batch_size=2, n_process=2)) == expected
+
+
+def test_write_jsonl_results():
+    out = io.StringIO()
+    results = grade_documents([("doc", TEXTS[0])])
+    assert write_jsonl_results(results, out) == 1
+    line = json.loads(out.getvalue())
+    assert line["id"] == "doc"
+    assert line["predicted_level"] == grade_with_probabilities(TEXTS[0])[0]["predicted_level"]
@@ -52,3 +52,110 @@ def test_grade_text(tmp_path):
     content = json.loads(output_json.read_text())
     assert "probabilities" in content
     # Check that input text words are present in the output if needed
+
+
+def test_grade_text_profile():
+    import json
+
+    result = runner.invoke(
+        app, ["grade-text", "--text", "bailar con el presidente", "--profile"]
+    )
+    assert result.exit_code == 0
+    content = json.loads(result.stdout)
+    assert "lemmatize" in content["timings"]["stages"]
+
+
+def test_grade_text_cache(tmp_path, monkeypatch):
+    import json
+
+    monkeypatch.setenv("SALSA_CACHE_DIR", str(tmp_path))
+    args = ["grade-text", "--text", "bailar con el presidente", "--cache"]
+    first = runner.invoke(app, args)
+    second = runner.invoke(app, args)
+    assert first.exit_code == second.exit_code == 0
+    assert json.loads(first.stdout) == json.loads(second.stdout)
+    assert (tmp_path / "results.sqlite").exists()
+
+
+def test_grade_text_cache_unwritable(tmp_path, monkeypatch):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setenv("SALSA_CACHE_DIR", str(blocker / "cache"))
+    result = runner.invoke(app, ["grade-text", "--text", "bailar con el presidente", "--cache"])
+    assert result.exit_code == 0
+    assert "grade" in result.stdout
+
+
+def test_grade_file_stream(tmp_path):
+    import csv
+    import json
+
+    test_file = tmp_path / "test.txt"
+    test_file.write_text("bailar con el presidente. " * 10)
+    output_csv = tmp_path / "test.csv"
+    result = runner.invoke(
+        app,
+        [
+            "grade-file",
+            "--filepath",
+            str(test_file),
+            "--output",
+            str(output_csv),
+            "--stream",
+            "--chunk-size",
+            "32",
+        ],
+    )
+    assert result.exit_code == 0
+    rows = list(csv.reader(output_csv.open()))
+    assert rows[0] == ["Word", "CEFR Level"]
+    assert sum(1 for row in rows if row[0] == "presidente") == 10
+    report = json.loads(result.stdout)
+    assert report["stats"]["total_words"] == len(rows) - 1
+
+
+def test_import_does_not_load_model_or_vocabulary():
+    import subprocess
+
+    code = (
+        "import sys, salsa_spa.cli, salsa_spa.vocab_lists as v; "
+        "print('spacy' in sys.modules, v._trie is None)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert out.split() == ["False", "True"]
+
+
+def test_warmup():
+    result = runner.invoke(app, ["warmup"])
+    assert result.exit_code == 0
+    from salsa_spa import vocab_lists
+
+    assert vocab_lists._trie is not None
+
+
+def test_grade_jsonl_and_grade_dir(tmp_path):
+    import json
+
+    docs = tmp_path / "docs.jsonl"
+    docs.write_text(
+        '{"id": "a", "text": "bailar con el presidente"}\n{"id": "b", "text": "hola"}\n',
+        encoding="utf-8",
+    )
+    output = tmp_path / "out.jsonl"
+    result = runner.invoke(
+        app,
+        ["grade-jsonl", "--input", str(docs), "--id-field", "id", "--ordered", "--output", str(output)],
+    )
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [line["id"] for line in lines] == ["a", "b"]
+    assert "predicted_level" in lines[0]
+
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "one.txt").write_text("bailar con el presidente", encoding="utf-8")
+    result = runner.invoke(app, ["grade-dir", "--dir", str(corpus), "--workers", "2"])
+    assert result.exit_code == 0
+    assert json.loads(result.stdout.strip().splitlines()[-1])["id"] == "one.txt"
@@ -0,0 +1,151 @@
+"""
+Tests for salsa_spa/daemon.py resident grading daemon.
+"""
+
+import json
+import os
+import socket
+import stat
+import threading
+import pytest
+from typer.testing import CliRunner
+from salsa_spa.cli import app
+from salsa_spa.daemon import (
+    daemon_grade,
+    daemon_word_levels,
+    make_daemon,
+    request_daemon,
+    stop_daemon,
+)
+from salsa_spa.grader_prob import grade_with_probabilities
+from salsa_spa.word_level import detect_word_levels
+
+TEXT = "Él lleva gafas y es inteligente."
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    daemon = make_daemon(str(tmp_path / "daemon.sock"))
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    yield daemon
+    daemon.shutdown()
+    daemon.server_close()
+    daemon.batcher.close()
+
+
+def test_daemon_grades_like_in_process(daemon):
+    assert daemon_grade(TEXT, path=daemon.path) == grade_with_probabilities(TEXT)[0]
+    word_levels, timings = daemon_word_levels(TEXT, path=daemon.path)
+    assert word_levels == list(detect_word_levels(TEXT))
+    assert timings is None
+    result = daemon_grade(TEXT, profile=True, path=daemon.path)
+    assert "timings" in result
+
+
+def test_socket_is_private(daemon):
+    assert stat.S_IMODE(os.stat(daemon.path).st_mode) == 0o600
+
+
+def test_second_daemon_is_refused(daemon):
+    with pytest.raises(RuntimeError):
+        make_daemon(daemon.path)
+
+
+def test_mismatched_client_is_not_served(daemon):
+    request = {"command": "grade", "text": TEXT, "version": "0", "pipeline": []}
+    response = request_daemon(request, path=daemon.path)
+    assert response["mismatch"]
+
+
+def test_no_daemon_falls_back(tmp_path):
+    # A missing or stale socket means grading in process
+    path = tmp_path / "daemon.sock"
+    assert daemon_grade(TEXT, path=str(path)) is None
+    path.write_text("")
+    assert daemon_grade(TEXT, path=str(path)) is None
+
+
+def test_cli_uses_daemon(daemon, monkeypatch):
+    monkeypatch.setenv("SALSA_DAEMON", "1")
+    monkeypatch.setenv("SALSA_DAEMON_SOCKET", daemon.path)
+    runner = CliRunner()
+    before = daemon.requests
+    result = runner.invoke(app, ["grade-text", "--text", TEXT])
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == grade_with_probabilities(TEXT)[0]
+    assert daemon.requests == before + 1
+
+    monkeypatch.setenv("SALSA_DAEMON", "0")
+    result = runner.invoke(app, ["grade-text", "--text", TEXT])
+    assert result.exit_code == 0
+    assert daemon.requests == before + 1
+
+    status = runner.invoke(app, ["daemon", "status"], env={"SALSA_DAEMON": "1"})
+    assert json.loads(status.stdout)["pid"] == os.getpid()
+
+
+def test_stop_daemon(tmp_path):
+    daemon = make_daemon(str(tmp_path / "daemon.sock"))
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    assert stop_daemon(daemon.path, timeout=0.1)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    daemon.server_close()
+    daemon.batcher.close()
+    assert not stop_daemon(str(tmp_path / "other.sock"))
+
+
+@pytest.fixture
+def fake_daemon(tmp_path):
+    # Accepts connections and answers each with `reply` (bytes), or never
+    # answers if reply is None
+    path = str(tmp_path / "fake.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    state = {"reply": None, "connections": []}
+
+    def serve():
+        while True:
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                return
+            state["connections"].append(connection)
+            connection.recv(65536)
+            if state["reply"] is not None:
+                connection.sendall(state["reply"])
+                connection.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield path, state
+    server.close()
+    for connection in state["connections"]:
+        connection.close()
+
+
+def test_silent_daemon_falls_back(fake_daemon, monkeypatch):
+    from salsa_spa import daemon
+
+    path, _ = fake_daemon
+    monkeypatch.setattr(daemon, "REQUEST_TIMEOUT", 0.2)
+    assert daemon_grade(TEXT, path=path) is None
+    assert daemon_word_levels(TEXT, path=path) is None
+
+    monkeypatch.setenv("SALSA_DAEMON", "1")
+    monkeypatch.setenv("SALSA_DAEMON_SOCKET", path)
+    result = CliRunner().invoke(app, ["grade-text", "--text", TEXT])
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == grade_with_probabilities(TEXT)[0]
+
+
+@pytest.mark.parametrize(
+    "reply", [b'{"result": {"grade"', b"not json\n", b"[1, 2]\n", b'{"word_levels": 3}\n']
+)
+def test_bad_reply_falls_back(fake_daemon, reply):
+    path, state = fake_daemon
+    state["reply"] = reply
+    assert daemon_grade(TEXT, path=path) is None
+    assert daemon_word_levels(TEXT, path=path) is None
@@ -0,0 +1,57 @@
+"""
+Tests for salsa_spa/evaluation.py offline evaluation.
+"""
+
+import json
+import pytest
+from salsa_spa.evaluation import evaluate, read_labeled_corpus
+from salsa_spa.grader_prob import grade_with_probabilities
+
+SAMPLES = [
+    ("cloroformo cloroformo cloroformo", "C2"),
+    ("él lleva gafas y es inteligente", "A1"),
+    ("bailar con el presidente", "A2"),
+    ("foo foo foo", "A1"),
+]
+
+
+def test_read_labeled_corpus(tmp_path):
+    jsonl = tmp_path / "corpus.jsonl"
+    jsonl.write_text(
+        "\n".join(json.dumps({"text": t, "category": c}) for t, c in SAMPLES)
+        + '\n{"text": "sin etiqueta"}\n',
+        encoding="utf-8",
+    )
+    assert list(read_labeled_corpus(str(jsonl))) == SAMPLES
+
+    csv_path = tmp_path / "corpus.csv"
+    csv_path.write_text(
+        "texto,nivel\n" + "".join(f'"{t}",{c}\n' for t, c in SAMPLES), encoding="utf-8"
+    )
+    samples = read_labeled_corpus(str(csv_path), text_field="texto", label_field="nivel")
+    assert list(samples) == SAMPLES
+
+
+def test_read_labeled_corpus_skips_invalid_lines(tmp_path, caplog):
+    # A malformed line or one that is not a JSON object does not stop reading
+    lines = [json.dumps({"text": t, "category": c}) for t, c in SAMPLES]
+    lines[1:1] = ['{"text": "cortado', '["una", "lista"]']
+    jsonl = tmp_path / "corpus.jsonl"
+    jsonl.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    with caplog.at_level("WARNING", logger="salsa_spa.evaluation"):
+        assert list(read_labeled_corpus(str(jsonl))) == SAMPLES
+    assert "Skipped 2 rows" in caplog.text
+
+
+@pytest.mark.parametrize("n_process", [1, 2])
+def test_evaluate(n_process):
+    report = evaluate(iter(SAMPLES), batch_size=2, n_process=n_process)
+    predicted = [grade_with_probabilities(text=t)[0]["predicted_level"] for t, _ in SAMPLES]
+    correct = sum(p == c for p, (_, c) in zip(predicted, SAMPLES))
+
+    assert report["n_samples"] == len(SAMPLES)
+    assert report["accuracy"] == correct / len(SAMPLES)
+    assert report["per_level"]["A1"]["n_samples"] == 2
+    assert report["confusion_matrix"]["C2"][predicted[0]] == 1
+    assert sum(sum(row.values()) for row in report["confusion_matrix"].values()) == len(SAMPLES)
+    assert report["throughput"]["texts_per_s"] > 0
@@ -0,0 +1,46 @@
+"""
+Tests for salsa_spa/expression_trie.py compact vocabulary trie.
+"""
+
+from salsa_spa.expression_trie import NO_ID, build_expression_trie
+
+LEVEL_DICT_BY_LENGTH = {
+    "A1": {1: {"salida", "llevar"}, 2: {"llevar gafa"}},
+    "B2": {1: {"salida"}, 3: {"llevar a cabo"}},
+    "C2": {1: {"cloroformo"}},
+}
+
+
+def test_views_roundtrip():
+    trie = build_expression_trie(LEVEL_DICT_BY_LENGTH)
+    assert trie.level_dict_by_length() == LEVEL_DICT_BY_LENGTH
+
+
+def test_encode_interns_lemmas():
+    trie = build_expression_trie(LEVEL_DICT_BY_LENGTH)
+    ids = trie.encode(["llevar", "gafa", "llevar", "desconocido"])
+    assert ids[0] == ids[2] != NO_ID
+    assert ids[3] == NO_ID
+    assert [trie.lemmas[i] for i in ids[:3]] == ["llevar", "gafa", "llevar"]
+
+
+def test_vocabulary_views_contain_built_rows():
+    # Expressions built from CSV rows are found in the views rebuilt from the trie
+    import csv
+    from itertools import islice
+    from salsa_spa.vocab_lists import (
+        VOCAB_CSV_PATH,
+        build_vocabulary,
+        get_level_dict,
+        get_level_dict_by_length,
+    )
+
+    with open(VOCAB_CSV_PATH, "r", encoding="utf-8") as f:
+        rows = [(row["word"], row["level"]) for row in islice(csv.DictReader(f), 0, None, 250)]
+    _, built_by_length = build_vocabulary(rows)
+    level_dict = get_level_dict()
+    level_dict_by_length = get_level_dict_by_length()
+    for level, length_dict in built_by_length.items():
+        for length, expressions in length_dict.items():
+            assert expressions <= level_dict_by_length[level][length]
+            assert expressions <= level_dict[level]
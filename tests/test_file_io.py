@@ -21,3 +21,33 @@ def test_export_to_csv(tmp_path):
     content = test_csv.read_text()
     assert "bailar" in content
     assert "presidente" in content
+
+
+def test_iter_text_chunks(tmp_path):
+    from salsa_spa.file_io import iter_text_chunks
+
+    test_file = tmp_path / "long.txt"
+    content = "Primera frase. Segunda frase, más larga.\n\nOtro párrafo aquí. " * 50
+    test_file.write_text(content, encoding="utf-8")
+    chunks = list(iter_text_chunks(filepath=str(test_file), chunk_size=64))
+    assert len(chunks) > 1
+    assert "".join(chunks) == content
+    # Chunks are only cut at whitespace, never inside a word
+    assert all(chunk[-1].isspace() for chunk in chunks[:-1])
+    assert max(len(chunk) for chunk in chunks) < 2 * 64
+
+
+def test_iter_text_chunks_missing_file(tmp_path):
+    from salsa_spa.file_io import iter_text_chunks
+
+    assert iter_text_chunks(filepath=str(tmp_path / "missing.txt")) is None
+
+
+def test_get_cache_dir(monkeypatch):
+    from salsa_spa.file_io import get_cache_dir
+
+    monkeypatch.setenv("SALSA_CACHE_DIR", "/tmp/salsa-test-cache")
+    assert get_cache_dir() == "/tmp/salsa-test-cache"
+    monkeypatch.delenv("SALSA_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", "/tmp/xdg")
+    assert get_cache_dir() == os.path.join("/tmp/xdg", "salsa_spa")
@@ -3,6 +3,7 @@ Tests for grade_with_probabilities in grader_prob.py
 """
 
 from salsa_spa.grader_prob import grade_with_probabilities
+import weakref
 import pytest
 
 
@@ -37,3 +38,92 @@ def test_all_a0():
     result, _ = grade_with_probabilities(text=text)
     assert result["probabilities"]["A0"] == 1.0
     assert result["grade"] == 0.0
+
+
+@pytest.mark.parametrize("n_process", [1, 2])
+def test_grade_many_matches_single(n_process):
+    from salsa_spa.grader_prob import grade_many
+
+    texts = [
+        "bailar con el presidente",
+        "",
+        "cloroformo cloroformo",
+        "él lleva gafas y es inteligente",
+        "foo foo foo foo",
+    ]
+    expected = [grade_with_probabilities(text=text) for text in texts]
+    results = list(grade_many(iter(texts), batch_size=2, n_process=n_process))
+    assert results == expected
+
+
+class Node:
+    # Weakly referenceable object in a reference cycle with itself
+    def __init__(self) -> None:
+        self.cycle = self
+
+
+def test_grade_many_keeps_callers_freeze():
+    # A warmup(freeze=True) before grading stays in effect; grade_many's
+    # own freeze around forking its workers is undone
+    import gc
+    from salsa_spa.grader_prob import grade_many
+
+    texts = ["bailar con el presidente", "cloroformo cloroformo"]
+    gc.unfreeze()
+    list(grade_many(texts, batch_size=1, n_process=2))
+    assert gc.get_freeze_count() == 0
+    gc.freeze()
+    try:
+        frozen = gc.get_freeze_count()
+        # Cyclic garbage created after the caller's freeze stays collectable
+        garbage = []
+        for _ in range(3):
+            garbage.append(weakref.ref(Node()))
+        list(grade_many(texts, batch_size=1, n_process=2))
+        assert gc.get_freeze_count() == frozen
+        gc.collect()
+        assert all(ref() is None for ref in garbage)
+    finally:
+        gc.unfreeze()
+
+
+def test_profile_timings():
+    text = "él lleva gafas y es inteligente"
+    expected, expected_levels = grade_with_probabilities(text=text)
+    result, word_levels = grade_with_probabilities(text=text, profile=True)
+    timings = result.pop("timings")
+    assert result == expected
+    assert word_levels == expected_levels
+    assert set(timings["stages"]) == {"load", "clean_text", "lemmatize", "match", "score"}
+    assert timings["total_time"] >= 0
+    assert timings["ngram_probes"] >= 6
+    assert timings["lemma_table_hits"] + timings["lemma_table_misses"] == 6
+    assert "timings" not in expected
+
+
+def test_accumulator_merge_and_serialize():
+    import json
+    from salsa_spa.grader_prob import GradeAccumulator
+    from salsa_spa.word_level import detect_word_levels
+
+    shards = [
+        "El niño lleva gafas y juega en el parque.",
+        "La jurisprudencia del tribunal constitucional resulta ineludible.",
+        "Me gusta bailar con mis amigos en el parque.",
+    ]
+    expected, _ = grade_with_probabilities(" ".join(shards))
+    accumulators = []
+    for i, shard in enumerate(shards):
+        accumulator = GradeAccumulator()
+        # Separators so the input lengths add up to that of the joined text
+        accumulator.add(detect_word_levels(shard), input_length=len(shard) + (i > 0))
+        accumulators.append(accumulator)
+
+    def roundtrip(accumulator):
+        return GradeAccumulator.from_dict(json.loads(json.dumps(accumulator.to_dict())))
+
+    a, b, c = (roundtrip(accumulator) for accumulator in accumulators)
+    left = GradeAccumulator().merge(a).merge(b).merge(c).result()
+    right = GradeAccumulator().merge(a).merge(GradeAccumulator().merge(b).merge(c)).result()
+    assert left == right == expected
+    assert roundtrip(GradeAccumulator()).result() == GradeAccumulator().result()
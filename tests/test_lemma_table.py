@@ -0,0 +1,37 @@
+"""
+Tests for salsa_spa/lemma_table.py form -> lemma lookup.
+"""
+
+from salsa_spa.lemma_table import LemmaTable, build_corpus_lemmas, lemmatize_words
+from salsa_spa.text_cleaning import extract_words, lemmatize_tokens
+
+
+def test_lemma_table_hits_and_fallback():
+    table = LemmaTable({"gafas": "gafa"})
+    assert table.lemmatize(["gafas", "gafas", "inteligente"]) == [
+        "gafa",
+        "gafa",
+        lemmatize_tokens(["inteligente"])[0],
+    ]
+    stats = table.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    # Fallback lemmas are not added to the table
+    assert stats["entries"] == 1
+
+
+def test_lemmatize_words_matches_lemmatize_tokens():
+    words = extract_words(text="Él lleva gafas y siempre sale por la salida de emergencia")
+    assert lemmatize_words(words) == lemmatize_tokens(words)
+    assert lemmatize_words([]) == []
+
+
+def test_build_corpus_lemmas(tmp_path, monkeypatch):
+    monkeypatch.setenv("SALSA_CACHE_DIR", str(tmp_path / "cache"))
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("Los zorritos corretean xyzzyplugh", encoding="utf-8")
+    assert build_corpus_lemmas([str(corpus)]) > 0
+    # Already known forms are not added twice
+    assert build_corpus_lemmas([str(corpus)]) == 0
+    words = ["zorritos", "xyzzyplugh"]
+    assert lemmatize_words(words) == lemmatize_tokens(words)
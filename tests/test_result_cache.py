@@ -0,0 +1,85 @@
+"""
+Tests for salsa_spa/result_cache.py persistent result cache.
+"""
+
+import multiprocessing
+from salsa_spa.grader_prob import grade_many, grade_with_probabilities
+from salsa_spa.result_cache import ResultCache
+
+TEXTS = [
+    "El niño lleva gafas y juega en el parque.",
+    "La jurisprudencia del tribunal constitucional resulta ineludible.",
+    "Me gusta bailar con mis amigos.",
+]
+
+
+def test_hit_returns_same_result(tmp_path):
+    cache = ResultCache(path=str(tmp_path / "results.sqlite"))
+    expected = grade_with_probabilities(TEXTS[0])
+    assert grade_with_probabilities(TEXTS[0], cache=cache) == expected
+    assert cache.stats()["misses"] == 1
+    assert grade_with_probabilities(TEXTS[0], cache=cache) == expected
+    assert cache.stats()["hits"] == 1
+
+
+def test_key_uses_normalized_words(tmp_path):
+    cache = ResultCache(path=str(tmp_path / "results.sqlite"))
+    text = TEXTS[2]
+    variant = "  " + text.replace(" ", "   ") + "\n"
+    assert cache.key(text) == cache.key(variant)
+    assert cache.key(text) != cache.key(TEXTS[0])
+    grade_with_probabilities(text, cache=cache)
+    result, _ = grade_with_probabilities(variant, cache=cache)
+    assert cache.stats()["hits"] == 1
+    # The input length is that of the text asked for, not the cached one
+    assert result == grade_with_probabilities(variant)[0]
+
+
+def test_grade_many_with_cache(tmp_path):
+    cache = ResultCache(path=str(tmp_path / "results.sqlite"))
+    texts = TEXTS + TEXTS[:1]
+    expected = list(grade_many(texts))
+    assert list(grade_many(texts, batch_size=2, cache=cache)) == expected
+    assert list(grade_many(texts, batch_size=2, cache=cache)) == expected
+    assert cache.stats()["entries"] == len(TEXTS)
+    assert cache.stats()["hits"] >= len(texts)
+
+
+def test_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr("salsa_spa.result_cache._EVICT_EVERY", 1)
+    cache = ResultCache(path=str(tmp_path / "results.sqlite"), max_entries=2)
+    for text in TEXTS:
+        grade_with_probabilities(text, cache=cache)
+    assert cache.stats()["entries"] == 2
+    assert cache.get(TEXTS[0]) is None
+    assert cache.get(TEXTS[2]) is not None
+
+
+def _fill_cache(path):
+    cache = ResultCache(path=path)
+    cache.put_many(TEXTS, [grade_with_probabilities(text) for text in TEXTS])
+
+
+def test_shared_between_processes(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    processes = [multiprocessing.Process(target=_fill_cache, args=(path,)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    cache = ResultCache(path=path)
+    assert cache.stats()["entries"] == len(TEXTS)
+    assert all(hit is not None for hit in cache.get_many(TEXTS))
+
+
+def test_unwritable_cache_dir(tmp_path):
+    # The cache is quietly unavailable instead of raising
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = ResultCache(path=str(blocker / "cache" / "results.sqlite"))
+    expected = grade_with_probabilities(TEXTS[0])
+    assert grade_with_probabilities(TEXTS[0], cache=cache) == expected
+    assert grade_with_probabilities(TEXTS[0], cache=cache) == expected
+    cache.clear()
+    assert cache.stats()["entries"] == 0
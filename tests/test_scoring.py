@@ -0,0 +1,51 @@
+"""
+Tests for salsa_spa/scoring.py vectorized scoring.
+"""
+
+from collections import Counter
+import numpy as np
+import pytest
+from salsa_spa.grader_prob import ALL_LEVELS, _build_report
+from salsa_spa.scoring import count_matrix, score_level_counts
+
+
+def scalar_reports(freqs):
+    return [
+        _build_report(
+            freq=freq,
+            total_words=sum(freq.values()),
+            unique_words=0,
+            unknown_words=freq.get("A0", 0),
+            input_length=0,
+            found_expressions={},
+        )
+        for freq in freqs
+    ]
+
+
+def random_freqs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    freqs = [Counter(), Counter({"A0": 5}), Counter({"C2": 4}), Counter({"A1": 1, "A0": 20})]
+    for _ in range(n):
+        # Sparse rows, so documents with one or a few levels are covered too
+        counts = rng.integers(0, 30, len(ALL_LEVELS)) * (rng.random(len(ALL_LEVELS)) < 0.5)
+        freqs.append(Counter({lvl: int(c) for lvl, c in zip(ALL_LEVELS, counts) if c}))
+    return freqs
+
+
+def test_score_level_counts_matches_scalar():
+    freqs = random_freqs(500)
+    scores = score_level_counts(count_matrix(freqs))
+    for i, report in enumerate(scalar_reports(freqs)):
+        assert scores["grade"][i] == pytest.approx(report["grade"], abs=1e-12)
+        assert scores["confidence"][i] == pytest.approx(report["confidence"], abs=1e-12)
+        assert scores["predicted_level"][i] == report["predicted_level"]
+        assert list(scores["probabilities"][i]) == pytest.approx(
+            [report["probabilities"][lvl] for lvl in ALL_LEVELS], abs=1e-12
+        )
+
+
+def test_score_level_counts_empty():
+    scores = score_level_counts(count_matrix([]))
+    assert scores["grade"].shape == (0,)
+    assert scores["probabilities"].shape == (0, len(ALL_LEVELS))
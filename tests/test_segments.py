@@ -0,0 +1,57 @@
+"""
+Tests for salsa_spa/segments.py segment-level grading.
+"""
+
+import pytest
+from salsa_spa.grader_prob import grade_with_probabilities
+from salsa_spa.segments import grade_segments, split_paragraphs
+
+PARAGRAPHS = [
+    "El niño lleva gafas y juega en el parque.",
+    "La jurisprudencia del tribunal constitucional resulta ineludible.",
+    "Me gusta bailar con mis amigos.",
+]
+
+
+def test_split_paragraphs():
+    text = "uno dos\n\n  tres\n \n\ncuatro\n"
+    assert [text[a:b] for a, b in split_paragraphs(text)] == ["uno dos", "tres", "cuatro\n"]
+    assert split_paragraphs("\n\n") == []
+
+
+def test_paragraph_segments_match_separate_grading():
+    text = "\n\n".join(PARAGRAPHS)
+    result, segments = grade_segments(text)
+    assert result == grade_with_probabilities(text)[0]
+    assert len(segments) == len(PARAGRAPHS)
+    for paragraph, segment in zip(PARAGRAPHS, segments):
+        assert text[segment["start_char"]:segment["end_char"]] == paragraph
+        expected = grade_with_probabilities(paragraph)[0]
+        assert segment["total_words"] == expected["stats"]["total_words"]
+        assert segment["predicted_level"] == expected["predicted_level"]
+        assert segment["grade"] == pytest.approx(expected["grade"])
+        assert segment["confidence"] == pytest.approx(expected["confidence"])
+
+
+def test_window_segments():
+    text = " ".join(PARAGRAPHS)
+    result, segments = grade_segments(text, window=4, step=3)
+    n_words = result["stats"]["total_words"]
+    assert segments[0]["start_word"] == 0
+    assert segments[-1]["end_word"] >= n_words
+    assert all(s["end_word"] - s["start_word"] <= 4 for s in segments)
+    assert [s["start_word"] for s in segments[:3]] == [0, 3, 6]
+
+    # One window over the whole text is the whole-document grade
+    _, whole = grade_segments(text, window=10000)
+    assert len(whole) == 1
+    assert whole[0]["grade"] == pytest.approx(result["grade"])
+    assert whole[0]["predicted_level"] == result["predicted_level"]
+
+
+def test_empty_text_and_invalid_window():
+    result, segments = grade_segments("")
+    assert segments == []
+    assert result["stats"]["total_words"] == 0
+    with pytest.raises(ValueError):
+        grade_segments("hola", window=0)
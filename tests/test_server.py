@@ -0,0 +1,92 @@
+"""
+Tests for salsa_spa/server.py HTTP grading service.
+"""
+
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from salsa_spa.grader_prob import grade_with_probabilities
+from salsa_spa.server import MicroBatcher, make_server
+
+TEXTS = [
+    "Él lleva gafas y es inteligente.",
+    "La salida de emergencia está al fondo.",
+    "",
+    "El cloroformo es peligroso.",
+]
+
+
+@pytest.fixture
+def server_url():
+    server = make_server(port=0, max_batch_size=4, max_wait=0.05)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    server.batcher.close()
+
+
+def post(url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), method="POST"
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_micro_batcher_groups_requests(monkeypatch):
+    from salsa_spa import server
+
+    batch_sizes = []
+    original = server.grade_many
+
+    def recording_grade_many(texts, batch_size):
+        batch_sizes.append(len(texts))
+        return original(texts, batch_size=batch_size)
+
+    monkeypatch.setattr(server, "grade_many", recording_grade_many)
+    batcher = MicroBatcher(max_batch_size=8, max_wait=0.5)
+    futures = [batcher.submit(text) for text in TEXTS]
+    results = [future.result() for future in futures]
+    batcher.close()
+    assert results == [grade_with_probabilities(text) for text in TEXTS]
+    assert batch_sizes == [len(TEXTS)]
+
+
+def test_concurrent_requests(server_url):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda t: post(f"{server_url}/grade", {"text": t}), TEXTS * 4))
+    expected = [json.loads(json.dumps(grade_with_probabilities(t)[0])) for t in TEXTS * 4]
+    assert results == expected
+
+
+def test_bad_requests(server_url):
+    with urllib.request.urlopen(f"{server_url}/health") as response:
+        assert json.loads(response.read()) == {"status": "ok"}
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(f"{server_url}/grade", {"txt": "hola"})
+    assert error.value.code == 400
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(f"{server_url}/other", {"text": "hola"})
+    assert error.value.code == 404
+
+
+@pytest.mark.parametrize(
+    "length, status", [(None, 400), ("abc", 400), ("-1", 400), ("99999999999", 413)]
+)
+def test_invalid_content_length(server_url, length, status):
+    host, port = server_url.rsplit("/", 1)[1].split(":")
+    connection = http.client.HTTPConnection(host, int(port), timeout=10)
+    connection.putrequest("POST", "/grade")
+    if length is not None:
+        connection.putheader("Content-Length", length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == status
+    assert "error" in json.loads(response.read())
+    connection.close()
@@ -0,0 +1,61 @@
+"""
+Tests for salsa_spa/session.py incremental document grading.
+"""
+
+import random
+from salsa_spa.grader_prob import grade_with_probabilities
+from salsa_spa.session import DocumentSession, split_sentences
+from salsa_spa.word_level import detect_word_levels
+
+SENTENCES = [
+    "Él lleva gafas y es inteligente. ",
+    "La salida de emergencia está al fondo.\n",
+    "Mi hermano suele llevar\n",
+    "gafas de sol en verano! ",
+    "El cloroformo es peligroso? ",
+    "Hecha la ley, hecha la trampa.\n\n",
+]
+
+
+def assert_matches_full_grading(session, text):
+    assert session.update(text) == grade_with_probabilities(text=text)[0]
+    assert session.word_levels() == detect_word_levels(text=text)
+
+
+def test_split_sentences():
+    text = "".join(SENTENCES) + "sin final"
+    assert "".join(split_sentences(text)) == text
+    assert split_sentences(text)[:2] == SENTENCES[:2]
+
+
+def test_random_edits_match_full_grading():
+    rng = random.Random(0)
+    session = DocumentSession()
+    text = ""
+    for _ in range(60):
+        position = rng.randrange(len(text) + 1)
+        if text and rng.random() < 0.4:
+            text = text[:position] + text[position + rng.randint(1, 30):]
+        else:
+            text = text[:position] + rng.choice(SENTENCES) + text[position:]
+        assert_matches_full_grading(session, text)
+    assert_matches_full_grading(session, "")
+
+
+def test_expression_across_sentences():
+    # "llevar gafas" spans a line break; editing either side regrades it
+    session = DocumentSession("Mi hermano suele llevar\ngafas.")
+    assert session.word_levels()[-1] == ("llevar gafas", "A1")
+    assert_matches_full_grading(session, "Mi hermano suele llevar\ngatos.")
+    assert_matches_full_grading(session, "Mi hermano suele llevar\ngafas.")
+
+
+def test_local_edit_rescans_few_sentences():
+    text = "".join(SENTENCES * 20)
+    session = DocumentSession(text)
+    middle = len(SENTENCES) * 10
+    sentences = split_sentences(text)
+    sentences[middle] = "Ella también lleva gafas. "
+    assert_matches_full_grading(session, "".join(sentences))
+    assert session.last_update["lemmatized"] == 1
+    assert session.last_update["rescanned"] <= 3
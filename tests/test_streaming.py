@@ -0,0 +1,34 @@
+"""
+Tests for salsa_spa/streaming.py.
+"""
+
+from salsa_spa.grader_prob import grade_with_probabilities
+from salsa_spa.streaming import StreamingGrader, grade_file_streaming
+
+
+TEXT = (
+    "Él lleva gafas y es inteligente. Quiere bailar con el presidente.\n\n"
+    "El entrenador habla con el aliado; el edil compra cloroformo. "
+) * 20
+
+
+def test_grade_file_streaming_matches_full_report(tmp_path):
+    test_file = tmp_path / "long.txt"
+    test_file.write_text(TEXT, encoding="utf-8")
+    expected, _ = grade_with_probabilities(text=TEXT)
+    assert grade_file_streaming(filepath=str(test_file), chunk_size=50) == expected
+
+
+def test_streaming_grader_incremental():
+    grader = StreamingGrader()
+    word_levels = grader.feed("llevar gafas ")
+    assert grader.result()["stats"]["total_words"] == len(word_levels)
+    word_levels += grader.feed("y es inteligente")
+    word_levels += grader.close()
+    expected, word_level_dict = grade_with_probabilities(text="llevar gafas y es inteligente")
+    assert grader.result() == expected
+    assert dict(word_levels) == word_level_dict
+
+
+def test_grade_file_streaming_missing_file(tmp_path):
+    assert grade_file_streaming(filepath=str(tmp_path / "missing.txt")) is None
@@ -19,3 +19,119 @@ def test_clean_text_punctuation():
 
 def test_clean_word_accents():
     assert clean_word(word="acción") == "accion"
+
+
+def test_lemmatize_tokens_aligned():
+    from salsa_spa.text_cleaning import lemmatize_tokens
+
+    words = ["los", "niños", "llevaban", "gafas"]
+    lemmas = lemmatize_tokens(words)
+    assert len(lemmas) == len(words)
+    assert lemmatize_tokens([]) == []
+
+
+def test_lemmatize_tokens_one_lemma_per_word():
+    # spaCy reads "suelos" as a verb and a clitic pronoun; its lemma stays one unit
+    from salsa_spa.text_cleaning import lemmatize_tokens
+
+    lemmas = lemmatize_tokens(["charla", "frenos", "uniforme", "suelos"])
+    assert len(lemmas) == 4
+    assert all(len(lemma.split()) == 1 for lemma in lemmas)
+
+
+def test_lemmatize_batch_matches_lemmatize_word():
+    from salsa_spa.text_cleaning import lemmatize_batch, lemmatize_word
+
+    texts = ["llevar gafas", "presidente", "los niños comían"]
+    assert lemmatize_batch(texts, batch_size=2) == [lemmatize_word(t) for t in texts]
+
+
+def test_lemma_cache_lru_eviction():
+    from salsa_spa.text_cleaning import LemmaCache
+
+    cache = LemmaCache(maxsize=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # "b" is now least recently used
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("c") == "C"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+    assert stats["size"] == 2
+
+    cache.resize(1)
+    assert cache.stats()["evictions"] == 2
+    cache.resize(0)
+    cache.put("d", "D")
+    assert cache.get("d") is None
+
+
+def test_lemma_cache_thread_safe():
+    from concurrent.futures import ThreadPoolExecutor
+    from salsa_spa.text_cleaning import LemmaCache
+
+    cache = LemmaCache(maxsize=50)
+
+    def work(i):
+        key = str(i % 100)
+        if cache.get(key) is None:
+            cache.put(key, key.upper())
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(5000)))
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 5000
+    assert stats["size"] <= 50
+
+
+def test_lemmatize_word_uses_cache():
+    from salsa_spa.text_cleaning import lemma_cache, lemmatize_word, lemmatize_batch
+
+    first = lemmatize_word("cantábamos")
+    hits = lemma_cache.stats()["hits"]
+    assert lemmatize_word("cantábamos") == first
+    assert lemmatize_batch(["cantábamos"]) == [first]
+    assert lemma_cache.stats()["hits"] == hits + 2
+
+
+def test_set_pipeline_excludes_components(monkeypatch):
+    from salsa_spa import text_cleaning
+
+    monkeypatch.setattr(text_cleaning, "MODEL_NAME", text_cleaning.MODEL_NAME)
+    monkeypatch.setattr(text_cleaning, "EXCLUDE", text_cleaning.EXCLUDE)
+    monkeypatch.setattr(text_cleaning, "_nlp", text_cleaning._nlp)
+    words = ["los", "niños", "llevaban", "gafas"]
+    expected = text_cleaning.lemmatize_tokens(words)
+
+    exclude = list(text_cleaning.DEFAULT_EXCLUDE) + ["vectors"]
+    text_cleaning.set_pipeline("es_core_news_sm", exclude)
+    assert text_cleaning.get_pipeline() == ("es_core_news_sm", tuple(exclude))
+    assert text_cleaning.lemma_cache_stats()["size"] == 0
+    nlp = text_cleaning.get_nlp()
+    assert "lemmatizer" in nlp.pipe_names
+    assert "parser" not in nlp.component_names
+    assert text_cleaning.lemmatize_tokens(words) == expected
+    text_cleaning.lemma_cache.clear()
+
+
+def test_configure_nlp_drops_vocabulary(monkeypatch):
+    from salsa_spa import configure_nlp, lemma_table, text_cleaning, vocab_lists
+
+    for module, name in [
+        (text_cleaning, "MODEL_NAME"),
+        (text_cleaning, "EXCLUDE"),
+        (text_cleaning, "_nlp"),
+        (vocab_lists, "_trie"),
+        (vocab_lists, "_form_lemmas"),
+        (vocab_lists, "_level_dict"),
+        (vocab_lists, "_level_dict_by_length"),
+        (lemma_table, "_table"),
+    ]:
+        monkeypatch.setattr(module, name, getattr(module, name))
+    vocab_lists.get_vocabulary_trie()
+    configure_nlp("es_core_news_sm")
+    assert text_cleaning.MODEL_NAME == "es_core_news_sm"
+    assert text_cleaning.EXCLUDE == text_cleaning.DEFAULT_EXCLUDE
+    assert vocab_lists._trie is None
+    assert lemma_table._table is None
@@ -0,0 +1,78 @@
+"""
+Tests for salsa_spa/vocab_index.py on-disk vocabulary index.
+"""
+
+import json
+import os
+import struct
+from salsa_spa.expression_trie import build_expression_trie
+from salsa_spa.vocab_index import index_key, index_path, read_index, write_index
+
+LEVEL_DICT_BY_LENGTH = {
+    "A1": {1: {"salida", "gafa"}, 2: {"llevar gafa"}},
+    "C2": {1: {"cloroformo"}},
+}
+FORM_LEMMAS = {"salidas": "salida", "gafas": "gafa", "llevaba": "llevar"}
+
+
+def test_index_roundtrip(tmp_path):
+    path = str(tmp_path / "vocab.idx")
+    trie = build_expression_trie(LEVEL_DICT_BY_LENGTH)
+    write_index(path, "abc", trie, FORM_LEMMAS, {"model": "test"})
+    loaded, form_lemmas = read_index(path, "abc")
+    assert loaded.lemmas == trie.lemmas
+    assert loaded.child_nodes == trie.child_nodes
+    # Derived arrays are stored rather than recomputed
+    assert loaded.best == trie.best
+    assert loaded.root_children == trie.root_children
+    assert loaded.max_length == trie.max_length
+    assert loaded.level_dict_by_length() == LEVEL_DICT_BY_LENGTH
+    assert form_lemmas == FORM_LEMMAS
+    # Lemma strings are shared with the trie
+    assert form_lemmas["gafas"] is loaded.lemmas[loaded.lemmas.index("gafa")]
+    # No temporary files are left behind
+    assert os.listdir(tmp_path) == ["vocab.idx"]
+
+
+def test_index_sections_are_aligned(tmp_path):
+    path = str(tmp_path / "vocab.idx")
+    write_index(path, "abc", build_expression_trie(LEVEL_DICT_BY_LENGTH), FORM_LEMMAS, {})
+    with open(path, "rb") as f:
+        data = f.read()
+    _, _, header_length = struct.unpack_from("<8sII", data)
+    base = 16 + header_length
+    assert base % 8 == 0
+    header = json.loads(data[16:base])
+    assert all(section["offset"] % 8 == 0 for section in header["sections"].values())
+
+
+def test_index_key_mismatch(tmp_path):
+    path = str(tmp_path / "vocab.idx")
+    write_index(path, "abc", build_expression_trie(LEVEL_DICT_BY_LENGTH), FORM_LEMMAS, {})
+    assert read_index(path, "other") is None
+
+
+def test_index_key_depends_on_csv_and_model(tmp_path):
+    csv_path = tmp_path / "vocab.csv"
+    csv_path.write_text("word,level\nsalida,A1\n", encoding="utf-8")
+    key = index_key(str(csv_path), "es_core_news_md")
+    assert index_key(str(csv_path), "es_core_news_md") == key
+    assert index_key(str(csv_path), "es_core_news_sm") != key
+    assert index_key(str(csv_path), "es_core_news_md", ["vectors"]) != key
+    csv_path.write_text("word,level\nsalida,A2\n", encoding="utf-8")
+    assert index_key(str(csv_path), "es_core_news_md") != key
+
+
+def test_index_path_uses_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("SALSA_CACHE_DIR", str(tmp_path))
+    assert index_path("abc") == os.path.join(str(tmp_path), "vocab-abc.idx")
+
+
+def test_save_to_read_only_cache_dir(tmp_path, monkeypatch):
+    # An unwritable cache location is reported but does not raise
+    from salsa_spa import vocab_lists
+
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setenv("SALSA_CACHE_DIR", str(blocker / "cache"))
+    vocab_lists._save_to_cache(build_expression_trie({"A1": {1: {"salida"}}}))
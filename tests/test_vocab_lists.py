@@ -12,3 +12,24 @@ def test_vocab_loaded():
     # Check at least one word in one level
     found = any(len(words) > 0 for words in level_dict.values())
     assert found
+
+
+def test_build_vocabulary_matches_sequential():
+    # Batched / multi-process build gives the same output as row-by-row lemmatization
+    from salsa_spa.text_cleaning import lemma_cache, lemma_cache_stats, lemmatize_word
+    from salsa_spa.vocab_lists import build_vocabulary
+
+    rows = [("llevar gafas", "A1"), ("presidente", "B2"), ("hecha la ley", "C2")]
+    # Start each build from an empty lemma cache, so both go through nlp.pipe
+    lemma_cache.clear()
+    batched = build_vocabulary(rows, batch_size=2, n_process=1)
+    lemma_cache.clear()
+    misses = lemma_cache_stats()["misses"]
+    parallel = build_vocabulary(rows, batch_size=1, n_process=2)
+    assert lemma_cache_stats()["misses"] > misses
+    assert batched == parallel
+    level_dict_result, level_dict_by_length_result = batched
+    for word, level in rows:
+        lemmatized = " ".join(lemmatize_word(word).split())
+        assert lemmatized in level_dict_result[level]
+        assert lemmatized in level_dict_by_length_result[level][len(lemmatized.split())]
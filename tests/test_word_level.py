@@ -53,7 +53,7 @@ def test_full_expression_match_complete():
     assert result[0][1] != "No results"
 
 
-def test_full_expression_match_partial_no_match():
+def test_full_expression_match_partial_no_match(monkeypatch):
     """
     Test that partial matches don't occur.
     If vocabulary has "llevar gafas" but text only has "llevar",
@@ -65,21 +65,17 @@ def test_full_expression_match_partial_no_match():
     }
     # Mock the level_dict_by_length for this test
     from salsa_spa import word_level
-    original_dict = word_level.level_dict_by_length
-    word_level.level_dict_by_length = {
+    monkeypatch.setattr(word_level, "level_dict_by_length", {
         "A1": {2: {"llevar gafa"}}  # 2-word expression
-    }
-    
-    try:
-        result = detect_word_levels(text="llevar", level_dictionary=test_dict)
-        # "llevar" alone should NOT match "llevar gafa"
-        assert len(result) == 1
-        assert result[0][1] == "No results"
-    finally:
-        word_level.level_dict_by_length = original_dict
+    }, raising=False)
 
+    result = detect_word_levels(text="llevar", level_dictionary=test_dict)
+    # "llevar" alone should NOT match "llevar gafa"
+    assert len(result) == 1
+    assert result[0][1] == "No results"
 
-def test_full_expression_match_longer_first():
+
+def test_full_expression_match_longer_first(monkeypatch):
     """
     Test that longer expressions are matched before shorter ones.
     If both "llevar" and "llevar gafas" exist, "llevar gafas" should match first.
@@ -89,19 +85,15 @@ def test_full_expression_match_longer_first():
         "A1": {"llevar", "llevar gafa"},
     }
     from salsa_spa import word_level
-    original_dict = word_level.level_dict_by_length
-    word_level.level_dict_by_length = {
+    monkeypatch.setattr(word_level, "level_dict_by_length", {
         "A1": {1: {"llevar"}, 2: {"llevar gafa"}}
-    }
-    
-    try:
-        result = detect_word_levels(text="llevar gafas", level_dictionary=test_dict)
-        # Should match "llevar gafas" (2 words) not just "llevar" (1 word)
-        assert len(result) == 1
-        assert result[0][0] == "llevar gafas"
-        assert result[0][1] == "A1"
-    finally:
-        word_level.level_dict_by_length = original_dict
+    }, raising=False)
+
+    result = detect_word_levels(text="llevar gafas", level_dictionary=test_dict)
+    # Should match "llevar gafas" (2 words) not just "llevar" (1 word)
+    assert len(result) == 1
+    assert result[0][0] == "llevar gafas"
+    assert result[0][1] == "A1"
 
 
 def test_full_expression_match_mixed():
@@ -119,7 +111,7 @@ def test_full_expression_match_mixed():
     assert "él" in words_found or any("él" in w for w in words_found)
 
 
-def test_highest_level_matched_first():
+def test_highest_level_matched_first(monkeypatch):
     """
     Test that when a word exists in multiple levels, the highest level is matched first.
     """
@@ -130,18 +122,120 @@ def test_highest_level_matched_first():
         "C1": {"test"},
     }
     from salsa_spa import word_level
-    original_dict = word_level.level_dict_by_length
-    word_level.level_dict_by_length = {
+    monkeypatch.setattr(word_level, "level_dict_by_length", {
         "A1": {1: {"test"}},
         "B2": {1: {"test"}},
         "C1": {1: {"test"}},
-    }
-    
-    try:
-        result = detect_word_levels(text="test", level_dictionary=test_dict)
-        # Should match at C1 (highest level), not A1 or B2
-        assert len(result) == 1
-        assert result[0][0] == "test"
-        assert result[0][1] == "C1", f"Expected C1, got {result[0][1]}"
-    finally:
-        word_level.level_dict_by_length = original_dict
+    }, raising=False)
+
+    result = detect_word_levels(text="test", level_dictionary=test_dict)
+    # Should match at C1 (highest level), not A1 or B2
+    assert len(result) == 1
+    assert result[0][0] == "test"
+    assert result[0][1] == "C1", f"Expected C1, got {result[0][1]}"
+
+
+def test_expressions_with_multi_token_lemmas_match():
+    # Words that spaCy splits into several tokens ("suelos" -> "sue él")
+    # must not push the rest of the expression out of line
+    expressions = [
+        ("comprobar los frenos", "C1"),
+        ("vestir de uniforme", "C1"),
+        ("estar por los suelos", "C2"),
+        ("estar con la moral por los suelos", "C2"),
+        ("impartir una charla", "C2"),
+        ("impartir una persona una charla", "C2"),
+    ]
+    for expression, level in expressions:
+        assert detect_word_levels(text=expression) == [(expression, level)]
+
+
+def test_text_lemmatized_once(monkeypatch):
+    """
+    The whole text goes through the lemmatizer in a single call,
+    regardless of how many candidate n-grams are tried.
+    """
+    from salsa_spa import word_level
+    calls = []
+    original = word_level.lemmatize_words
+
+    def counting_lemmatize_words(words):
+        calls.append(list(words))
+        return original(words)
+
+    monkeypatch.setattr(word_level, "lemmatize_words", counting_lemmatize_words)
+    text = "él lleva gafas y es inteligente " * 20
+    result = detect_word_levels(text=text, level_dictionary=level_dict)
+    assert len(calls) == 1
+    assert " ".join(w for w, _ in result) == " ".join(text.split())
+
+
+def test_match_word_levels_uses_lemma_slices(monkeypatch):
+    """
+    Matching works on the provided lemma sequence, but reports surface forms.
+    """
+    from salsa_spa import word_level
+    monkeypatch.setattr(word_level, "level_dict_by_length", {
+        "A1": {1: {"gafa"}, 2: {"llevar gafa"}},
+        "B1": {1: {"llevar"}},
+    }, raising=False)
+
+    result = word_level.match_word_levels(
+        words=["llevaba", "gafas", "llevaba"],
+        lemmas=["llevar", "gafa", "llevar"],
+    )
+    assert result == [("llevaba gafas", "A1"), ("llevaba", "B1")]
+
+
+def test_restored_vocabulary_is_not_an_override(monkeypatch):
+    """
+    Assigning the loaded vocabulary back to the module, as the restore of
+    an override does, keeps matching against the prebuilt vocabulary trie.
+    """
+    from salsa_spa import word_level
+    from salsa_spa.vocab_lists import get_vocabulary_trie
+
+    monkeypatch.setattr(
+        word_level, "level_dict_by_length", word_level.level_dict_by_length, raising=False
+    )
+    assert word_level.get_expression_trie() is get_vocabulary_trie()
+
+
+def test_expression_trie_highest_level():
+    """
+    Terminal nodes hold the highest level of their expression; prefixes of
+    longer expressions are not terminals unless listed on their own.
+    """
+    from salsa_spa.word_level import _longest_match, build_expression_trie
+
+    trie = build_expression_trie({
+        "A1": {1: {"test"}, 2: {"llevar gafa"}},
+        "C1": {1: {"test"}},
+    })
+    # (end, level, complete) of the longest match from position 0
+    assert _longest_match(trie, trie.encode(["test"]), 0)[:3] == (1, "C1", True)
+    assert _longest_match(trie, trie.encode(["llevar"]), 0)[:3] == (0, None, False)
+    assert _longest_match(trie, trie.encode(["llevar", "gafa"]), 0)[:3] == (2, "A1", True)
+    assert _longest_match(trie, trie.encode(["unknown"]), 0)[:3] == (0, None, True)
+
+
+def test_streaming_matcher_across_chunks(monkeypatch):
+    """
+    Expressions split over chunk boundaries are matched as if the text
+    had been matched in one piece.
+    """
+    from salsa_spa import word_level
+    monkeypatch.setattr(word_level, "level_dict_by_length", {
+        "A1": {1: {"llevar"}, 2: {"llevar gafa"}},
+        "B1": {3: {"de vez en"}, 4: {"de vez en cuando"}},
+    }, raising=False)
+
+    words = ["llevaba", "gafas", "de", "vez", "en", "llevaba", "de"]
+    lemmas = ["llevar", "gafa", "de", "vez", "en", "llevar", "de"]
+    expected = word_level.match_word_levels(words=words, lemmas=lemmas)
+    for split in range(len(words) + 1):
+        matcher = word_level.StreamingMatcher()
+        result = matcher.feed(words[:split], lemmas[:split])
+        result += matcher.feed(words[split:], lemmas[split:])
+        result += matcher.flush()
+        assert result == expected